@@ -0,0 +1,105 @@
+# backend/benchmarks/bench_catalog_refresh.py
+# Catalog refresh cost, end to end: full rebuild (index + every user's feeds + the
+# parallel scorer's shared copy) vs refresh_catalog (diff + in-place delta).
+# Run from the backend folder: python benchmarks/bench_catalog_refresh.py
+import os
+import dataclasses
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_scoring import COLORS, USER_PROFILE, make_catalog
+from catalog import ProductColumns
+from catalog_sync import CatalogSync, refresh_catalog
+from feeds import FeedStore
+from parallel_scoring import ParallelScorer
+from records import to_records
+
+SCOPE = ("bench", "all")
+
+
+def make_store(columns, users):
+    store = FeedStore(columns)
+    for u in range(users):
+        profile = dict(USER_PROFILE, flattering_colors=[COLORS[u % len(COLORS)]])
+        store.schedule(f"user_{u}", profile)
+    rebuild_all(store, columns)
+    return store
+
+
+def rebuild_all(store, columns):
+    """What the feed-builder thread does after refresh_catalog, run inline"""
+    store.refresh_catalog(columns)
+    store.pending.clear()
+    for entry in store.users.values():
+        entry.feeds = store.build_feeds(entry.profile, columns, store.catalog_version, entry.fingerprint)
+
+
+def next_scrape(products, share, seed):
+    """Reprice `share` of the catalog, drop a few products and add a few new ones"""
+    rng = random.Random(seed)
+    # A real scrape returns fresh objects even for unchanged products
+    scrape = [dataclasses.replace(p) for p in products]
+    changes = max(1, int(len(scrape) * share))
+    for i in rng.sample(range(len(scrape)), changes):
+        scrape[i] = dataclasses.replace(scrape[i], price=rng.randrange(300, 6000, 50))
+    for _ in range(changes // 10):
+        scrape.pop(rng.randrange(len(scrape)))
+    for j, product in enumerate(make_catalog(changes // 10, seed=seed)):
+        scrape.append(dict(product, product_id=f"new_{seed}_{j}"))
+    return to_records(scrape)
+
+
+def main():
+    n, users = 100_000, 20
+    products = to_records(make_catalog(n))
+    sync = CatalogSync()
+    columns, _ = refresh_catalog(sync, SCOPE, products, None)
+    store = make_store(columns, users)
+    # Two workers and no size cutover, so the shared copy exists on any machine
+    scorer = ParallelScorer(columns, workers=2, min_products=0)
+    print(f"products={n} users={users} feeds/user={len(store.intent_keys)}")
+
+    for round_, share in enumerate((0.001, 0.01)):
+        scrape = next_scrape(products, share, seed=round_ + 1)
+
+        start = time.perf_counter()
+        rebuilt = ProductColumns(scrape)
+        index_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for entry in store.users.values():
+            store.build_feeds(entry.profile, rebuilt, store.catalog_version, entry.fingerprint)
+        feed_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rebuilt_scorer = ParallelScorer(rebuilt, workers=2, min_products=0)
+        scorer_time = time.perf_counter() - start
+        rebuilt_scorer.close()
+        rebuild_time = index_time + feed_time + scorer_time
+
+        # The same steps as refresh_catalog, timed one by one
+        start = time.perf_counter()
+        delta = sync.diff(SCOPE, scrape)
+        diff_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = store.apply_delta(columns, delta)
+        apply_time = time.perf_counter() - start
+        start = time.perf_counter()
+        scorer.apply_delta(columns, *rows)
+        share_time = time.perf_counter() - start
+        assert scorer.parallel
+        refresh_time = diff_time + apply_time + share_time
+        products = scrape
+
+        print(f"changed={share:.1%} (+{len(delta.inserts)} ~{len(delta.updates)} -{len(delta.deletes)})")
+        print(f"  full rebuild: index {index_time * 1e3:7.1f} ms + feeds {feed_time * 1e3:7.1f} ms "
+              f"+ scorer {scorer_time * 1e3:6.1f} ms = {rebuild_time * 1e3:7.1f} ms")
+        print(f"  incremental:  diff  {diff_time * 1e3:7.1f} ms + apply {apply_time * 1e3:7.1f} ms "
+              f"+ scorer {share_time * 1e3:6.1f} ms = {refresh_time * 1e3:7.1f} ms "
+              f"({rebuild_time / refresh_time:.0f}x faster end to end)")
+    scorer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# backend/benchmarks/bench_color_extraction.py
+# Per-image latency of local dominant-colour extraction (target: < 20 ms on CPU).
+# Run from the backend folder: python benchmarks/bench_color_extraction.py
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from color_extraction import describe_colors, extract_dominant_colors
+
+TARGET_MS = 20
+REPEAT = 20
+
+
+def make_photo(size, garment, accent, fmt, seed=0):
+    """Garment-like shape on a light background, saved as fmt"""
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.new("RGB", size, (236, 234, 230))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([width * 0.2, height * 0.15, width * 0.8, height * 0.9], fill=garment)
+    for _ in range(6):
+        x, y = rng.uniform(0.25, 0.7) * width, rng.uniform(0.2, 0.8) * height
+        draw.ellipse([x, y, x + width * 0.06, y + width * 0.06], fill=accent)
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, quality=90)
+    return buffer.getvalue()
+
+
+def main():
+    cases = [
+        ("1600x1200 jpeg", make_photo((1200, 1600), (31, 42, 68), (245, 245, 245), "JPEG")),
+        ("4000x3000 jpeg", make_photo((3000, 4000), (114, 47, 55), (212, 160, 23), "JPEG")),
+        ("1080x1350 png", make_photo((1080, 1350), (4, 99, 7), (17, 17, 17), "PNG")),
+        ("1080x1350 webp", make_photo((1080, 1350), (244, 166, 192), (245, 245, 245), "WEBP")),
+    ]
+    for label, data in cases:
+        times = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            colors = extract_dominant_colors(data)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        median_ms = times[len(times) // 2] * 1e3
+        status = "ok" if median_ms < TARGET_MS else "SLOW"
+        print(f"{label:<16} median={median_ms:6.2f} ms p95={times[int(len(times) * 0.95) - 1] * 1e3:6.2f} ms "
+              f"[{status}] {describe_colors(colors)}")
+
+
+if __name__ == "__main__":
+    main()
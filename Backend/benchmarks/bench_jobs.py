@@ -0,0 +1,66 @@
+# backend/benchmarks/bench_jobs.py
+# Job queue throughput against the stub model: submit latency, queue wait and jobs/s by worker count.
+# Run from the backend folder: python benchmarks/bench_jobs.py
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import DONE, JobQueue, JobRunner
+from model_guard import GuardedModel
+from stub_model import StubModel
+
+MODEL_LATENCY = 0.1
+JOBS = 200
+# Five ~200 KB photos, roughly what analyze-colors receives
+PHOTO = base64.b64encode(os.urandom(200_000)).decode()
+
+
+async def run(workers):
+    guarded = GuardedModel(StubModel(latency=MODEL_LATENCY, seed=0))
+
+    async def analyze_colors(payload, attempt):
+        response = await guarded.generate(["color analysis"] + payload["image_parts"])
+        return json.loads(response.text.split("```json")[1].split("```")[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite3"), max_depth=JOBS)
+        runner = JobRunner(queue, {"analyze_colors": analyze_colors}, workers=workers)
+        await runner.start()
+        payload = {"user_id": "bench", "image_parts": [{"mime_type": "image/jpeg", "data": PHOTO}] * 5}
+
+        start = time.perf_counter()
+        submit_times = []
+        job_ids = []
+        for _ in range(JOBS):
+            t = time.perf_counter()
+            job_ids.append(runner.submit("analyze_colors", "bench", payload))
+            submit_times.append(time.perf_counter() - t)
+            await asyncio.sleep(0)
+        while runner.counters["completed"] + runner.counters["failed"] < JOBS:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+
+        metrics = runner.metrics()
+        done = sum(queue.get(job_id)["status"] == DONE for job_id in job_ids)
+        await runner.stop()
+    submit_times.sort()
+    print(f"workers={workers:>3} jobs={done}/{JOBS} {JOBS / elapsed:6.1f} jobs/s  "
+          f"submit p50={submit_times[len(submit_times) // 2] * 1e3:5.2f} ms  "
+          f"wait p50={metrics['wait_p50_seconds']:6.2f} s p95={metrics['wait_p95_seconds']:6.2f} s  "
+          f"run p50={metrics['run_p50_seconds']:.2f} s")
+
+
+def main():
+    print(f"stub model latency {MODEL_LATENCY * 1e3:.0f} ms, {JOBS} jobs of 5 photos each")
+    for workers in (1, 4, 16):
+        asyncio.run(run(workers))
+
+
+if __name__ == "__main__":
+    main()
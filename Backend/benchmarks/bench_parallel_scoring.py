@@ -0,0 +1,60 @@
+# backend/benchmarks/bench_parallel_scoring.py
+# Scaling of ParallelScorer from 1 to N worker processes on a large synthetic catalog.
+# Run from the backend folder: python benchmarks/bench_parallel_scoring.py [n_products]
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_scoring import USER_PROFILE, make_catalog
+from catalog import ProductColumns
+from parallel_scoring import ParallelScorer
+
+INTENT = {"occasion": "office", "budget": 2500}
+TOP_K = 10
+REPEAT = 5
+
+
+async def time_scorer(scorer):
+    """Best wall time of REPEAT top-k calls, and the scores of the last one"""
+    await scorer.top_k(USER_PROFILE, INTENT, TOP_K)  # warm up the pool
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        _, scores = await scorer.top_k(USER_PROFILE, INTENT, TOP_K)
+        times.append(time.perf_counter() - start)
+    return min(times), scores
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    columns = ProductColumns(make_catalog(n))
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({w for w in (1, 2, 4, 8, 16, 32) if w <= cores} | {cores})
+    baseline = None
+    expected = None
+    for workers in worker_counts:
+        # min_products=0 skips the cutover; workers=1 is the in-process baseline
+        scorer = ParallelScorer(columns, workers=workers, min_products=0)
+        best, scores = asyncio.run(time_scorer(scorer))
+        scorer.close()
+
+        if expected is None:
+            expected = scores
+        assert np.allclose(scores, expected), "parallel top-k diverges from in-process top-k"
+        baseline = baseline or best
+        mode = "process pool" if workers > 1 else "in-process"
+        print(f"n={n} workers={workers:>2} ({mode:<12}) best={best * 1e3:8.2f} ms "
+              f"speedup={baseline / best:5.2f}x")
+
+    if cores == 1:
+        print("Only one CPU available; no parallel speedup can be measured here.")
+
+
+if __name__ == "__main__":
+    main()
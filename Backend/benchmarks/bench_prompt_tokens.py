@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_prompt_tokens.py
+# Style DNA wardrobe tokens by wardrobe size: the old indented JSON vs encode_wardrobe.
+# Run from the backend folder: python benchmarks/bench_prompt_tokens.py
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_encoding import WARDROBE_TOKEN_BUDGET, count_tokens, encode_wardrobe
+
+SUBCATEGORIES = {
+    "top": ["t-shirt", "blouse", "shirt", "sweater"],
+    "bottom": ["jeans", "trousers", "skirt"],
+    "dress": ["midi-dress", "maxi-dress"],
+    "outerwear": ["blazer", "denim jacket"],
+    "shoes": ["sneakers", "heels", "loafers"],
+}
+COLORS = ["black", "white", "navy blue", "olive green", "beige", "crimson red", "blush pink"]
+PATTERNS = ["solid", "solid", "solid", "striped", "floral", "checkered"]
+FITS = ["regular", "fitted", "oversized", "loose"]
+TAGS = ["minimalist", "classic", "casual", "streetwear", "preppy", "bohemian", "edgy"]
+
+
+def make_wardrobe(n, seed=0):
+    """Synthetic wardrobe; real ones repeat basics, so draws are skewed"""
+    rng = random.Random(seed)
+    items = []
+    for _ in range(n):
+        category = rng.choices(list(SUBCATEGORIES), weights=[5, 3, 1, 1, 2])[0]
+        items.append({
+            "category": category,
+            "subcategory": rng.choice(SUBCATEGORIES[category]),
+            "primary_color": rng.choices(COLORS, weights=[5, 5, 3, 1, 2, 1, 1])[0],
+            "pattern": rng.choice(PATTERNS),
+            "fit": rng.choices(FITS, weights=[5, 3, 1, 1])[0],
+            "formality_level": rng.randint(2, 6),
+            "style_tags": rng.sample(TAGS[:4], 2),
+        })
+    return items
+
+
+def legacy_encoding(items):
+    """What generate_style_dna used to embed"""
+    return json.dumps([
+        {k: item[k] for k in ("category", "subcategory", "primary_color", "pattern",
+                              "fit", "formality_level", "style_tags")}
+        for item in items
+    ], indent=2)
+
+
+def gemini_counter():
+    """model.count_tokens when GEMINI_API_KEY is set (network), to check the local estimate"""
+    if not os.getenv("GEMINI_API_KEY"):
+        return None
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    model = genai.GenerativeModel("gemini-1.5-pro")
+    return lambda text: model.count_tokens(text).total_tokens
+
+
+def main():
+    print(f"token budget for the wardrobe table: {WARDROBE_TOKEN_BUDGET}")
+    exact = gemini_counter()
+    if exact is None:
+        print("(set GEMINI_API_KEY to compare the estimates with Gemini's own token counts)")
+    for n in (5, 20, 50, 100, 250, 500, 1000):
+        items = make_wardrobe(n)
+        before = count_tokens(legacy_encoding(items))
+        start = time.perf_counter()
+        text, stats = encode_wardrobe(items)
+        elapsed = time.perf_counter() - start
+        print(f"items={n:>5} json={before:>7} tokens  compact={stats['tokens']:>5} tokens "
+              f"({1 - stats['tokens'] / before:4.0%} smaller)  rows={stats['rows_listed']}/{stats['distinct_rows']}  "
+              f"encode={elapsed * 1e3:5.1f} ms  chars {len(legacy_encoding(items))}->{len(text)}")
+        if exact is not None and n <= 100:
+            print(f"             gemini: json={exact(legacy_encoding(items)):>7} tokens  compact={exact(text):>5} tokens")
+
+
+if __name__ == "__main__":
+    main()
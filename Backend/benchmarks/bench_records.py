@@ -0,0 +1,62 @@
+# backend/benchmarks/bench_records.py
+# Memory of product dicts vs slotted Product records, and per-request allocations
+# of copying every scored product vs index-based ScoreResults (tracemalloc).
+# Run from the backend folder: python benchmarks/bench_records.py
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_scoring import USER_PROFILE, make_catalog
+from catalog import ProductColumns
+from recommendation import calculate_match_score, rank_products, score_products_batch
+from records import to_records
+
+N_PRODUCTS = 100_000
+INTENT = {"occasion": "office", "budget": 2500}
+
+
+def measure(fn):
+    """(result, bytes still allocated, peak bytes) for one call"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - before, peak - before
+
+
+def legacy_scored_copies(products):
+    """What get_recommendations used to do: one dict copy per product, then sort"""
+    scored = [
+        {**p, "relevance_score": calculate_match_score(USER_PROFILE, p, INTENT), "reason": ""}
+        for p in products
+    ]
+    scored.sort(key=lambda x: x["relevance_score"], reverse=True)
+    return scored[:10]
+
+
+def main():
+    # Catalog storage; the source dicts for the records are freed before the reading
+    dicts, dict_bytes, _ = measure(lambda: make_catalog(N_PRODUCTS))
+    records, record_bytes, _ = measure(lambda: to_records(make_catalog(N_PRODUCTS)))
+    print(f"catalog of {N_PRODUCTS} products:")
+    print(f"  dicts   {dict_bytes / N_PRODUCTS:7.0f} B/product  {dict_bytes / 2**20:7.1f} MiB")
+    print(f"  records {record_bytes / N_PRODUCTS:7.0f} B/product  {record_bytes / 2**20:7.1f} MiB  "
+          f"({1 - record_bytes / dict_bytes:.0%} smaller)")
+
+    # Per-request allocation
+    columns = ProductColumns(records)
+    _, _, legacy_peak = measure(lambda: legacy_scored_copies(dicts))
+    _, _, batch_peak = measure(lambda: score_products_batch(USER_PROFILE, columns, INTENT))
+    _, _, ranked_peak = measure(lambda: rank_products(USER_PROFILE, INTENT, 10, columns))
+    print("per-request peak allocation:")
+    print(f"  copy every product        {legacy_peak / 2**20:7.1f} MiB")
+    print(f"  batched scores only       {batch_peak / 2**20:7.1f} MiB")
+    print(f"  rank_products (top-10)    {ranked_peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
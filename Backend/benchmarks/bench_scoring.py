@@ -0,0 +1,82 @@
+# backend/benchmarks/bench_scoring.py
+# Compare the per-product scorer with the batched scorer on a synthetic catalog.
+# Run from the backend folder: python benchmarks/bench_scoring.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from catalog import ProductColumns
+from occasions import SEASONS, STYLE_TAGS
+from recommendation import calculate_match_score, score_products_batch
+
+COLORS = ["pink", "white", "black", "navy blue", "olive green", "mustard", "red", "emerald green"]
+STORES = ["myntra", "amazon"]
+CATEGORIES = ["top", "bottom", "dress", "outerwear", "shoes"]
+BRANDS = ["Brand X", "Brand Y", "Brand Z"]
+
+USER_PROFILE = {
+    "flattering_colors": ["emerald green", "navy blue", "white"],
+    "colors_to_avoid": ["mustard"],
+    "style_dna": {
+        "top_style_tags": ["minimalist", "classic", "elegant", "casual", "preppy"],
+        "formality_range": "smart-casual",
+    },
+}
+
+
+def make_catalog(n, seed=0):
+    """Synthetic products shaped like the scraper output"""
+    rng = random.Random(seed)
+    return [
+        {
+            "store": rng.choice(STORES),
+            "product_id": f"bench_{i}",
+            "title": f"Item {i}",
+            "price": rng.randrange(300, 6000, 50),
+            "image_url": f"https://via.placeholder.com/300x400?text=Item+{i}",
+            "product_url": f"https://example.com/item-{i}",
+            "category": rng.choice(CATEGORIES),
+            "color": rng.choice(COLORS),
+            "style_tags": rng.sample(STYLE_TAGS, rng.randint(1, 3)),
+            "formality_level": rng.randint(1, 10),
+            "seasonality": rng.sample(SEASONS, rng.randint(1, 2)),
+            "brand": rng.choice(BRANDS),
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    for n in (1_000, 10_000, 100_000):
+        products = make_catalog(n)
+        build_time, columns = best_of(lambda: ProductColumns(products), repeat=1)
+        for occasion in ("casual", "office", "wedding"):
+            intent = {"occasion": occasion, "budget": 2500}
+            scalar_time, scalar = best_of(
+                lambda: [calculate_match_score(USER_PROFILE, p, intent) for p in products]
+            )
+            batch_time, batch = best_of(lambda: score_products_batch(USER_PROFILE, columns, intent))
+            assert np.allclose(scalar, batch), "batched scores diverge from calculate_match_score"
+            print(
+                f"n={n:>7} occasion={occasion:<8} scalar={scalar_time * 1e3:8.2f} ms "
+                f"batch={batch_time * 1e3:7.2f} ms speedup={scalar_time / batch_time:6.1f}x "
+                f"(columns built once in {build_time * 1e3:.1f} ms)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# backend/catalog.py
+from types import SimpleNamespace
+
+import numpy as np
+
+from occasions import STYLE_TAGS, season_mask
+from records import as_product
+
+DEFAULT_FORMALITY = 5
+
+# Array attributes of ProductColumns that scoring reads
+COLUMN_NAMES = ("color", "price", "formality", "season_mask", "tags", "category", "store", "live")
+
+# Plural category names shoppers use, mapped to the scraper's category values
+CATEGORY_ALIASES = {"tops": "top", "bottoms": "bottom", "dresses": "dress"}
+
+# Deleted rows are tombstoned; past this share of dead rows, rebuild instead
+MAX_TOMBSTONE_SHARE = 0.25
+
+
+def _name(value):
+    """Lower-case string form of a category or store (plain string or records enum)"""
+    return str(getattr(value, "value", value)).lower()
+
+
+class ProductColumns:
+    """
+    Column-oriented view of a product list for batched scoring.
+    Row i of every array describes products[i], held as a records.Product
+    (product dicts are converted on the way in). Rows are stable across
+    apply_delta, so indices held by feeds stay valid; version counts the
+    deltas applied, so copies (e.g. a ParallelScorer's) can tell they are stale.
+    """
+
+    def __init__(self, products):
+        self.products = [as_product(p) for p in products]
+
+        # Colours and tags are interned to small integer IDs. Tag columns start
+        # with the fixed STYLE_TAGS vocabulary so occasion priors line up.
+        self.color_ids = {}
+        self.category_ids = {}
+        self.store_ids = {}
+        self.tag_ids = {tag: i for i, tag in enumerate(STYLE_TAGS)}
+        for product in self.products:
+            self.color_ids.setdefault(product["color"], len(self.color_ids))
+            for tag in product["style_tags"]:
+                self.tag_ids.setdefault(tag, len(self.tag_ids))
+
+        n = len(self.products)
+        self.color = np.empty(n, dtype=np.int32)
+        self.price = np.empty(n, dtype=np.float64)
+        self.formality = np.empty(n, dtype=np.int8)
+        self.season_mask = np.empty(n, dtype=np.uint8)
+        self.tags = np.zeros((n, len(self.tag_ids)), dtype=np.float64)
+        self.category = np.empty(n, dtype=np.int16)
+        self.store = np.empty(n, dtype=np.int16)
+        self.live = np.ones(n, dtype=bool)
+        self.row_of = {}
+        self.version = 0
+
+        for i, product in enumerate(self.products):
+            self._set_row(i, product)
+
+    def _set_row(self, i, product):
+        product = as_product(product)
+        self.products[i] = product
+        self.row_of[product.get("product_id")] = i
+        self.color[i] = self.color_ids.setdefault(product["color"], len(self.color_ids))
+        self.price[i] = product["price"]
+        self.formality[i] = product.get("formality_level", DEFAULT_FORMALITY)
+        self.season_mask[i] = season_mask(product.get("seasonality"))
+        self.tags[i] = 0.0
+        for tag in product["style_tags"]:
+            self.tags[i, self.tag_ids[tag]] = 1.0
+        self.category[i] = self.category_ids.setdefault(_name(product["category"]), len(self.category_ids))
+        self.store[i] = self.store_ids.setdefault(_name(product["store"]), len(self.store_ids))
+        self.live[i] = True
+
+    def __len__(self):
+        return len(self.products)
+
+    def tag_vector(self, tags):
+        """Multi-hot vector over this catalog's tag columns"""
+        vector = np.zeros(len(self.tag_ids), dtype=np.float64)
+        for tag in set(tags):
+            if tag in self.tag_ids:
+                vector[self.tag_ids[tag]] = 1.0
+        return vector
+
+    def category_filter(self, category):
+        """Category ID a shopping intent filters on, None for any, -1 if no product has it"""
+        if not category:
+            return None
+        category = _name(category)
+        return self.category_ids.get(CATEGORY_ALIASES.get(category, category), -1)
+
+    def store_filter(self, stores):
+        """Store IDs a shopping intent filters on, or None for any store"""
+        if not stores:
+            return None
+        return [self.store_ids[s] for s in map(_name, stores) if s in self.store_ids]
+
+    def subset(self, rows):
+        """Scoring columns for just these rows (for score_columns)"""
+        return SimpleNamespace(**{name: getattr(self, name)[rows] for name in COLUMN_NAMES})
+
+    def apply_delta(self, delta):
+        """
+        Apply a catalog_sync.CatalogDelta in place: updates overwrite their row,
+        inserts are appended and deletes are tombstoned.
+        Returns (changed_rows, deleted_rows), or None when the delta needs a full
+        rebuild (a new style tag column, or too many tombstones).
+        """
+        changed_products = delta.inserts + delta.updates
+        if any(tag not in self.tag_ids for p in changed_products for tag in p["style_tags"]):
+            return None
+        deleted = [self.row_of[pid] for pid in delta.deletes if pid in self.row_of]
+        dead = int((~self.live).sum()) + len(deleted)
+        if dead > MAX_TOMBSTONE_SHARE * (len(self) + len(delta.inserts)):
+            return None
+
+        self.version += 1
+        for pid in delta.deletes:
+            self.row_of.pop(pid, None)
+        self.live[deleted] = False
+
+        changed = []
+        inserts = list(delta.inserts)
+        for product in delta.updates:
+            i = self.row_of.get(product["product_id"])
+            if i is None:
+                inserts.append(product)
+                continue
+            self._set_row(i, product)
+            changed.append(i)
+
+        if inserts:
+            # Appending copies the arrays (a memcpy), but the per-row Python
+            # work, which dominates a rebuild, only touches the new rows
+            start, extra = len(self), len(inserts)
+            self.products.extend([None] * extra)
+            for name in COLUMN_NAMES:
+                array = getattr(self, name)
+                padding = np.zeros((extra,) + array.shape[1:], dtype=array.dtype)
+                setattr(self, name, np.concatenate([array, padding]))
+            for offset, product in enumerate(inserts):
+                self._set_row(start + offset, product)
+                changed.append(start + offset)
+
+        return np.array(changed, dtype=np.int64), np.array(deleted, dtype=np.int64)
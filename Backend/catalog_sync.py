@@ -0,0 +1,93 @@
+# backend/catalog_sync.py
+from dataclasses import dataclass, field
+
+from catalog import ProductColumns
+from records import to_records
+
+
+@dataclass(slots=True)
+class CatalogDelta:
+    inserts: list = field(default_factory=list)
+    updates: list = field(default_factory=list)
+    deletes: list = field(default_factory=list)   # product_ids
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+
+class CatalogSync:
+    """
+    Tracks the last scraped version of every product and turns each fresh
+    scrape into inserts, updates and deletes. Deletes are scoped: a product
+    is only deleted when the same scope (e.g. ("myntra", "tops")) that
+    produced it last time no longer returns it.
+    """
+
+    def __init__(self):
+        self.products = {}        # product_id -> product
+        self.scopes = {}          # scope -> set of product_ids
+        self.owners = {}          # product_id -> number of scopes returning it
+
+    def diff(self, scope, products):
+        """Compare a scrape for one scope with the previous state and record it"""
+        delta = CatalogDelta()
+        seen = set()
+        for product in products:
+            pid = product["product_id"]
+            if pid in seen:
+                continue
+            seen.add(pid)
+            # Products are records, so this compares field by field
+            previous = self.products.get(pid)
+            if previous is None:
+                delta.inserts.append(product)
+            elif previous != product:
+                delta.updates.append(product)
+            else:
+                continue
+            self.products[pid] = product
+
+        before = self.scopes.get(scope, set())
+        for pid in seen - before:
+            self.owners[pid] = self.owners.get(pid, 0) + 1
+        for pid in before - seen:
+            self.owners[pid] -= 1
+            if self.owners[pid] == 0:
+                del self.owners[pid]
+                del self.products[pid]
+                delta.deletes.append(pid)
+        self.scopes[scope] = seen
+        return delta
+
+
+def refresh_catalog(sync, scope, products, columns, feeds=None, scorer=None):
+    """
+    Diff one scrape (product dicts or records; they are kept as records),
+    apply the delta to the product index and pass it on to
+    the recommendation feeds. Falls back to a full rebuild only when the index
+    cannot absorb the delta. Returns (columns, delta); columns is a new
+    ProductColumns after a rebuild.
+    A parallel_scoring.ParallelScorer gets the changed rows written into its
+    shared copy after a delta, or is moved to the new columns after a rebuild.
+    """
+    delta = sync.diff(scope, to_records(products))
+    if not delta:
+        return columns, delta
+
+    if columns is None:
+        rows = None
+    elif feeds is not None:
+        # The feed store applies it under its build lock, so no feed build reads
+        # the columns while they change
+        rows = feeds.apply_delta(columns, delta)
+    else:
+        rows = columns.apply_delta(delta)
+    if rows is None:
+        columns = ProductColumns(list(sync.products.values()))
+        if feeds is not None:
+            feeds.refresh_catalog(columns)
+        if scorer is not None:
+            scorer.rebuild(columns)
+    elif scorer is not None:
+        scorer.apply_delta(columns, *rows)
+    return columns, delta
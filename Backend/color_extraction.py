@@ -0,0 +1,193 @@
+# backend/color_extraction.py
+import io
+
+import numpy as np
+from PIL import Image
+
+# Fashion colour vocabulary (names match what the wardrobe prompt asks for)
+COLOR_VOCABULARY = {
+    "black": "#111111",
+    "charcoal grey": "#36454f",
+    "grey": "#8e8e8e",
+    "white": "#f5f5f5",
+    "ivory": "#fffff0",
+    "beige": "#d8c3a5",
+    "camel": "#c19a6b",
+    "brown": "#6f4e37",
+    "navy blue": "#1f2a44",
+    "royal blue": "#2a52be",
+    "sky blue": "#87ceeb",
+    "denim blue": "#3b5b92",
+    "teal": "#008080",
+    "emerald green": "#046307",
+    "olive green": "#6b6b2a",
+    "sage green": "#9caf88",
+    "mint green": "#98e2c6",
+    "mustard": "#d4a017",
+    "yellow": "#f7d842",
+    "orange": "#f28c28",
+    "burnt orange": "#cc5500",
+    "coral": "#ff7f50",
+    "peach": "#ffcba4",
+    "red": "#c8102e",
+    "crimson red": "#990000",
+    "burgundy": "#722f37",
+    "pink": "#f4a6c0",
+    "hot pink": "#ff3e96",
+    "blush pink": "#f2c4c4",
+    "lavender": "#b9a6d9",
+    "purple": "#6a3d9a",
+    "berry red": "#8e1c4a",
+}
+
+SAMPLE_SIZE = 64            # images are downsampled to at most this many pixels per side
+N_CLUSTERS = 4
+KMEANS_ITERATIONS = 8
+BACKGROUND_DELTA_E = 12     # pixels this close to the border colour count as background
+MIN_SHARE = 0.05            # drop clusters covering less than this share of the garment
+MATCH_DELTA_E = 25          # a claimed colour within this distance of a measured one is plausible
+
+
+def srgb_to_lab(rgb):
+    """Convert an (..., 3) array of 0-255 sRGB values to CIE Lab (D65)"""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([
+        [0.4124, 0.2126, 0.0193],
+        [0.3576, 0.7152, 0.1192],
+        [0.1805, 0.0722, 0.9505],
+    ])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def _hex_to_rgb(value):
+    return [int(value[i:i + 2], 16) for i in (1, 3, 5)]
+
+
+VOCABULARY_NAMES = list(COLOR_VOCABULARY)
+VOCABULARY_LAB = srgb_to_lab([_hex_to_rgb(h) for h in COLOR_VOCABULARY.values()])
+
+
+def _load_pixels(image_bytes):
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == "JPEG":
+        image.draft("RGB", (SAMPLE_SIZE * 2, SAMPLE_SIZE * 2))  # cheap JPEG downscale while decoding
+    else:
+        # PNG and WebP have no draft mode and decode at full size; box-reduce
+        # straight to near the sample size before any resampling
+        factor = min(image.size) // (SAMPLE_SIZE * 2)
+        if factor > 1:
+            image = image.reduce(factor)
+    image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return np.asarray(image.convert("RGB"), dtype=np.float64)
+
+
+def _foreground_mask(lab):
+    """Mask out pixels matching the (median) border colour, assumed to be background"""
+    border = np.concatenate([lab[0], lab[-1], lab[:, 0], lab[:, -1]])
+    background = np.median(border, axis=0)
+    mask = np.linalg.norm(lab - background, axis=-1) > BACKGROUND_DELTA_E
+    # A garment filling the frame leaves little foreground; fall back to every pixel
+    return mask if mask.mean() > 0.1 else np.ones(mask.shape, dtype=bool)
+
+
+def _kmeans(points, k):
+    """
+    Vectorized Lloyd's k-means with deterministic quantile initialisation.
+    Returns the cluster centres and each point's cluster label.
+    """
+    order = np.argsort(points[:, 0])
+    centers = points[order[np.linspace(0, len(points) - 1, k).astype(int)]]
+    for iteration in range(KMEANS_ITERATIONS + 1):
+        distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=-1)
+        labels = distances.argmin(axis=1)
+        if iteration == KMEANS_ITERATIONS:
+            break
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=points[:, c], minlength=k) for c in range(3)], axis=-1)
+        nonempty = counts > 0
+        centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centers, labels
+
+
+def nearest_color_name(lab):
+    """Closest vocabulary colour name and its Delta E"""
+    distances = np.linalg.norm(VOCABULARY_LAB - lab, axis=-1)
+    i = int(distances.argmin())
+    return VOCABULARY_NAMES[i], float(distances[i])
+
+
+def extract_dominant_colors(image_bytes, k=N_CLUSTERS, mask_background=True):
+    """
+    Dominant garment colours, largest first:
+    [{"name": "navy blue", "hex": "#1f2a44", "lab": [L, a, b], "share": 0.62}, ...]
+    """
+    rgb = _load_pixels(image_bytes)
+    lab = srgb_to_lab(rgb)
+    mask = _foreground_mask(lab) if mask_background else np.ones(lab.shape[:2], dtype=bool)
+    points, colors = lab[mask], rgb[mask]
+
+    centers, labels = _kmeans(points, min(k, len(points)))
+    counts = np.bincount(labels, minlength=len(centers))
+    shares = counts / counts.sum()
+
+    results = {}
+    for i in np.argsort(-shares):
+        if not counts[i]:
+            continue
+        name, _ = nearest_color_name(centers[i])
+        if name in results:
+            # Shades of the same named colour are merged into the larger cluster
+            results[name]["share"] += float(shares[i])
+            continue
+        # Report the mean sRGB of the cluster for the hex value
+        mean_rgb = colors[labels == i].mean(axis=0)
+        results[name] = {
+            "name": name,
+            "hex": "#" + "".join(f"{int(round(v)):02x}" for v in mean_rgb),
+            "lab": [round(float(v), 1) for v in centers[i]],
+            "share": float(shares[i]),
+        }
+
+    merged = sorted(results.values(), key=lambda c: c["share"], reverse=True)
+    return [{**c, "share": round(c["share"], 3)} for c in merged if c["share"] >= MIN_SHARE]
+
+
+def color_claim_is_plausible(claimed, dominant_colors):
+    """
+    Whether a model-claimed colour name is close to any measured colour.
+    Returns None when the name is not in the vocabulary and cannot be checked.
+    """
+    claimed = (claimed or "").lower().strip()
+    if claimed not in COLOR_VOCABULARY:
+        return None
+    lab = VOCABULARY_LAB[VOCABULARY_NAMES.index(claimed)]
+    return any(
+        np.linalg.norm(np.array(c["lab"]) - lab) <= MATCH_DELTA_E for c in dominant_colors
+    )
+
+
+def colors_match(colors, other_colors):
+    """
+    Whether two measured colour lists describe the same garment colour: each
+    list's dominant colour is within MATCH_DELTA_E of some colour in the other.
+    Returns None when either list is missing or empty.
+    """
+    if not colors or not other_colors:
+        return None
+
+    def covered(color, candidates):
+        return any(np.linalg.norm(np.array(color["lab"]) - np.array(c["lab"])) <= MATCH_DELTA_E for c in candidates)
+
+    return covered(colors[0], other_colors) and covered(other_colors[0], colors)
+
+
+def describe_colors(dominant_colors):
+    """One-line summary for prompts, e.g. 'navy blue #1f2a44 (62%), white #f4f4f2 (30%)'"""
+    return ", ".join(f"{c['name']} {c['hex']} ({c['share']:.0%})" for c in dominant_colors)
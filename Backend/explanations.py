@@ -0,0 +1,90 @@
+# backend/explanations.py
+import json
+
+# Score components recorded by calculate_match_score
+PALETTE_HIT = "palette_hit"
+PALETTE_CLASH = "palette_clash"
+TAG_OVERLAP = "tag_overlap"
+BUDGET_FIT = "budget_fit"
+OVER_BUDGET = "over_budget"
+FORMALITY = "formality"
+FORMALITY_MISMATCH = "formality_mismatch"
+OCCASION_STYLE = "occasion_style"
+
+TEMPLATES = {
+    PALETTE_HIT: "{color} is one of your flattering colours",
+    PALETTE_CLASH: "{color} is on your colours-to-avoid list",
+    TAG_OVERLAP: "it matches your {tags} style",
+    BUDGET_FIT: "it fits your ₹{budget} budget",
+    OVER_BUDGET: "it is ₹{over} over your budget",
+    FORMALITY: "the formality suits the {occasion} occasion",
+    FORMALITY_MISMATCH: "it is dressier or more casual than the {occasion} occasion calls for",
+    OCCASION_STYLE: "its style and season fit the {occasion} occasion",
+}
+
+MAX_REASONS = 3
+
+
+def record(components, code, points, **details):
+    """Note that a score component fired (no-op when not collecting)"""
+    if components is not None:
+        components[code] = {"points": points, **details}
+
+
+def generate_explanation(components):
+    """Render a short explanation from the components that fired while scoring"""
+    if not components:
+        return "A good all-round match for your profile."
+
+    # Strongest signals first, whether they helped or hurt the score
+    ranked = sorted(components.items(), key=lambda kv: abs(kv[1]["points"]), reverse=True)
+    phrases = []
+    for code, details in ranked[:MAX_REASONS]:
+        template = TEMPLATES.get(code)
+        if template:
+            phrases.append(template.format(**details))
+
+    if not phrases:
+        return "A good all-round match for your profile."
+    sentence = ", ".join(phrases[:-1]) + (" and " if len(phrases) > 1 else "") + phrases[-1]
+    return sentence[0].upper() + sentence[1:] + "."
+
+
+async def rewrite_explanations(model, user_profile, products, explanations):
+    """
+    Polish template explanations with a single batched call through a
+    model_guard.GuardedModel. Falls back to the template text if the guard
+    refuses the call, or the call or parsing fails.
+    """
+    if not explanations:
+        return explanations
+
+    lines = "\n".join(
+        f"{i}. {product.get('title', 'Item')}: {text}"
+        for i, (product, text) in enumerate(zip(products, explanations))
+    )
+    season = user_profile.get("season", "unknown")
+    prompt = f"""
+    You are a friendly personal stylist. The client's colour season is {season}.
+    Rewrite each numbered explanation below into one warm, specific sentence
+    addressed to the client. Keep every fact; do not invent new ones.
+
+    {lines}
+
+    RETURN EXACT JSON FORMAT:
+    ["sentence for 0", "sentence for 1", ...]
+    """
+
+    try:
+        response = await model.generate([prompt])
+        text = response.text
+        if '```' in text:
+            text = text.split('```')[1].removeprefix('json')
+        rewritten = json.loads(text.strip())
+    except Exception as e:
+        print(f"Explanation rewrite failed, using templates: {str(e)}")
+        return explanations
+
+    if not isinstance(rewritten, list) or len(rewritten) != len(explanations):
+        return explanations
+    return [str(s) for s in rewritten]
@@ -0,0 +1,340 @@
+# backend/feeds.py
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from catalog import CATEGORY_ALIASES
+from recommendation import build_score_query, score_columns, score_products_batch, top_k_indices
+
+# Intents precomputed for every active user; anything else is scored live
+FEED_CATEGORIES = ("", "top", "bottom", "dress")
+FEED_OCCASIONS = ("casual", "office", "party")
+FEED_BUDGETS = (1000, 2000, 3000, 5000)
+FEED_SIZE = int(os.getenv("FEED_SIZE", "50"))
+FEED_MAX_AGE_SECONDS = float(os.getenv("FEED_MAX_AGE_SECONDS", str(6 * 3600)))
+ACTIVE_USER_SECONDS = float(os.getenv("FEED_ACTIVE_USER_SECONDS", str(7 * 24 * 3600)))
+
+# Intent fields a feed accounts for; an intent setting any other field is scored
+# live. color_preference is not read by the scorer, so it does not change rankings.
+FEED_INTENT_FIELDS = {"category", "occasion", "budget", "stores", "color_preference"}
+
+
+def intent_key(shopping_intent):
+    """(category, occasion, budget) identifying a shopping intent"""
+    category = (shopping_intent.get("category") or "").lower()
+    return (
+        CATEGORY_ALIASES.get(category, category),
+        (shopping_intent.get("occasion") or "").lower(),
+        shopping_intent.get("budget"),
+    )
+
+
+def _store_names(products):
+    return {str(getattr(p["store"], "value", p["store"])).lower() for p in products if p is not None}
+
+
+def default_intent_keys():
+    return list(itertools.product(FEED_CATEGORIES, FEED_OCCASIONS, FEED_BUDGETS))
+
+
+def profile_fingerprint(user_profile):
+    """Changes whenever anything the scorer reads from the profile changes"""
+    relevant = {
+        "flattering_colors": user_profile.get("flattering_colors"),
+        "colors_to_avoid": user_profile.get("colors_to_avoid"),
+        "top_style_tags": user_profile["style_dna"].get("top_style_tags"),
+        "formality_range": user_profile["style_dna"].get("formality_range"),
+    }
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(slots=True)
+class Feed:
+    """Precomputed top-N for one user and intent, as catalog row indices"""
+    indices: np.ndarray     # int32
+    scores: np.ndarray      # float32
+    threshold: float        # every row not in the feed scores at most this
+    catalog_version: int
+    profile_fingerprint: str
+    built_at: float
+
+
+@dataclass(slots=True)
+class UserFeeds:
+    profile: dict
+    fingerprint: str
+    feeds: dict
+    last_seen: float
+
+
+class FeedStore:
+    """
+    Per-user precomputed recommendation feeds for common intents, rebuilt by
+    a background thread after catalog refreshes and profile changes.
+    lock guards the store's state; build_lock is held while the catalog columns
+    are read for a build or changed by a delta, so the two never interleave.
+    """
+
+    def __init__(self, columns=None, intent_keys=None, feed_size=FEED_SIZE,
+                 max_age=FEED_MAX_AGE_SECONDS):
+        self.columns = columns
+        self.catalog_stores = _store_names(columns.products) if columns is not None else set()
+        self.catalog_version = 0
+        self.generation = 0              # bumped by every catalog refresh and delta
+        self.intent_keys = set(intent_keys or default_intent_keys())
+        self.feed_size = feed_size
+        self.max_age = max_age
+        self.users = {}
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.pending = OrderedDict()     # user_id -> None, in request order
+        self.wakeup = threading.Condition(self.lock)
+        self.worker = None
+        self.stopping = False
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "uncommon": 0, "rebuilds": 0}
+
+    # ---------- scheduling ----------
+
+    def start(self):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, name="feed-builder", daemon=True)
+            self.worker.start()
+
+    def stop(self):
+        with self.lock:
+            self.stopping = True
+            self.wakeup.notify_all()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def schedule(self, user_id, user_profile=None):
+        """Queue a rebuild of the user's feeds (optionally with a fresh profile)"""
+        with self.lock:
+            if user_profile is not None:
+                entry = self.users.get(user_id)
+                if entry is None:
+                    self.users[user_id] = UserFeeds(user_profile, profile_fingerprint(user_profile), {}, time.time())
+                else:
+                    entry.profile = user_profile
+                    entry.fingerprint = profile_fingerprint(user_profile)
+            if user_id in self.users:
+                self.pending[user_id] = None
+                self.wakeup.notify()
+
+    def refresh_catalog(self, columns):
+        """Swap in a new catalog; every active user's feeds become stale and are rebuilt"""
+        stores = _store_names(columns.products)
+        with self.lock:
+            self.columns = columns
+            self.catalog_stores = stores
+            self.catalog_version += 1
+            self.generation += 1
+            cutoff = time.time() - ACTIVE_USER_SECONDS
+            for user_id in [u for u, e in self.users.items() if e.last_seen < cutoff]:
+                del self.users[user_id]
+            for user_id in self.users:
+                self.pending[user_id] = None
+            self.wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.stopping:
+                    self.wakeup.wait()
+                if self.stopping:
+                    return
+                user_id, _ = self.pending.popitem(last=False)
+            with self.build_lock:
+                self._build_user(user_id)
+
+    def _build_user(self, user_id):
+        """Rebuild one user's feeds; the caller holds build_lock"""
+        with self.lock:
+            entry = self.users.get(user_id)
+            columns, version, generation = self.columns, self.catalog_version, self.generation
+            if entry is None or columns is None:
+                return
+            profile, fingerprint = entry.profile, entry.fingerprint
+        try:
+            feeds = self.build_feeds(profile, columns, version, fingerprint)
+        except Exception as e:
+            print(f"Feed build failed for {user_id}: {str(e)}")
+            return
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is None:
+                return
+            if entry.fingerprint != fingerprint or self.generation != generation:
+                # Profile or catalog changed while we were building; build again
+                self.pending[user_id] = None
+                return
+            entry.feeds = feeds
+            self.counters["rebuilds"] += 1
+
+    def build_feeds(self, user_profile, columns, version, fingerprint):
+        """Score the catalog once per (occasion, budget) and cut a top-N per category"""
+        built_at = time.time()
+        categories = self._categories(columns.products)
+        feeds = {}
+        by_scoring_pass = {}
+        for category, occasion, budget in self.intent_keys:
+            by_scoring_pass.setdefault((occasion, budget), []).append(category)
+        for (occasion, budget), feed_categories in by_scoring_pass.items():
+            scores = score_products_batch(user_profile, columns, {"occasion": occasion, "budget": budget})
+            for category in feed_categories:
+                candidates = columns.live & (categories == category) if category else columns.live
+                rows = np.flatnonzero(candidates)
+                top = rows[top_k_indices(scores[rows], self.feed_size)]
+                # A feed holding every candidate row has nothing below it
+                threshold = float(np.float32(scores[top[-1]])) if len(rows) > len(top) else -np.inf
+                feeds[(category, occasion, budget)] = Feed(
+                    top.astype(np.int32), scores[top].astype(np.float32), threshold,
+                    version, fingerprint, built_at
+                )
+        return feeds
+
+    @staticmethod
+    def _categories(products):
+        return np.array([
+            "" if p is None else getattr(p["category"], "value", p["category"]) for p in products
+        ])
+
+    def apply_delta(self, columns, delta):
+        """
+        Apply a catalog_sync.CatalogDelta to columns (the store's catalog) and
+        patch every fresh feed for the rows it changed. Only the changed rows
+        are scored, once per user and scoring pass, so the cost follows the
+        size of the delta rather than the catalog. Returns what
+        columns.apply_delta returned (None: the caller must rebuild).
+        """
+        with self.build_lock:
+            rows = columns.apply_delta(delta)
+            if rows is not None:
+                self._patch_feeds(columns, *rows)
+            return rows
+
+    def _patch_feeds(self, columns, changed_rows, deleted_rows):
+        """
+        Re-score the changed rows for every user outside self.lock, so lookups
+        are not held up, then swap the patched feeds in. The caller holds
+        build_lock, so no build replaces feeds meanwhile; a catalog refresh
+        does, and bumps the generation, in which case the patches are dropped.
+        """
+        touched = np.concatenate([changed_rows, deleted_rows])
+        categories = self._categories([columns.products[i] for i in changed_rows])
+        subset = columns.subset(changed_rows)
+        stores = _store_names([columns.products[i] for i in changed_rows])
+        with self.lock:
+            self.columns = columns
+            self.catalog_stores |= stores
+            self.generation += 1
+            generation, version = self.generation, self.catalog_version
+            users = [(user_id, entry.profile, entry.feeds) for user_id, entry in self.users.items()]
+
+        patched = []
+        for user_id, profile, feeds in users:
+            by_scoring_pass = {}
+            for (category, occasion, budget), feed in feeds.items():
+                if feed.catalog_version == version:
+                    by_scoring_pass.setdefault((occasion, budget), []).append((category, feed))
+            new_feeds = dict(feeds)
+            for (occasion, budget), pass_feeds in by_scoring_pass.items():
+                intent = {"occasion": occasion, "budget": budget}
+                scores = score_columns(subset, build_score_query(profile, columns, intent))
+                for category, feed in pass_feeds:
+                    new_feeds[(category, occasion, budget)] = self._patch(
+                        feed, touched, changed_rows, scores, categories == category if category else None
+                    )
+            patched.append((user_id, feeds, new_feeds))
+
+        with self.lock:
+            if self.generation != generation:
+                return
+            for user_id, feeds, new_feeds in patched:
+                entry = self.users.get(user_id)
+                if entry is not None and entry.feeds is feeds:
+                    entry.feeds = new_feeds
+
+    def _patch(self, feed, touched, changed_rows, changed_scores, category_mask):
+        """
+        Merge re-scored rows into a copy of a feed, keeping only the part that
+        is still exact. The feed itself is left alone, since lookups may be
+        reading it.
+        """
+        keep = ~np.isin(feed.indices, touched)
+        candidates = changed_scores >= 0
+        if category_mask is not None:
+            candidates &= category_mask
+        indices = np.concatenate([feed.indices[keep], changed_rows[candidates].astype(np.int32)])
+        scores = np.concatenate([feed.scores[keep], changed_scores[candidates].astype(np.float32)])
+        # Rows outside the feed score <= threshold, so only entries at or above it are exact
+        exact = scores >= feed.threshold
+        indices, scores = indices[exact], scores[exact]
+        order = np.argsort(-scores, kind="stable")
+        threshold = feed.threshold
+        if len(order) > self.feed_size:
+            threshold = max(threshold, float(scores[order[self.feed_size]]))
+            order = order[:self.feed_size]
+        return Feed(indices[order], scores[order], threshold,
+                    feed.catalog_version, feed.profile_fingerprint, feed.built_at)
+
+    # ---------- serving ----------
+
+    def lookup(self, user_id, user_profile, shopping_intent, top_k):
+        """
+        (Feed, ProductColumns it indexes) when a fresh feed covers this request,
+        or None to fall through to live scoring. Stale or missing feeds
+        schedule a rebuild in the background.
+        """
+        key = intent_key(shopping_intent)
+        fingerprint = profile_fingerprint(user_profile)
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None:
+                entry.last_seen = time.time()
+            if (key not in self.intent_keys or top_k > self.feed_size
+                    or not self._covers(shopping_intent)):
+                self.counters["uncommon"] += 1
+                return None
+            feed = entry.feeds.get(key) if entry is not None else None
+            if feed is None:
+                self.counters["misses"] += 1
+            elif (feed.catalog_version != self.catalog_version
+                  or feed.profile_fingerprint != fingerprint
+                  or (len(feed.indices) < top_k and feed.threshold > -np.inf)
+                  or time.time() - feed.built_at > self.max_age):
+                self.counters["stale"] += 1
+                feed = None
+            else:
+                self.counters["hits"] += 1
+                return feed, self.columns
+        self.schedule(user_id, user_profile)
+        return None
+
+    def _covers(self, shopping_intent):
+        """Whether a feed (built over every store) answers this intent's filters"""
+        if any(value for field, value in shopping_intent.items() if field not in FEED_INTENT_FIELDS):
+            return False
+        stores = shopping_intent.get("stores")
+        # A store filter naming every store in the catalog filters nothing
+        return not stores or self.catalog_stores <= {str(s).lower() for s in stores}
+
+    def metrics(self):
+        with self.lock:
+            now = time.time()
+            ages = [now - f.built_at for e in self.users.values() for f in e.feeds.values()]
+            return {
+                **self.counters,
+                "users": len(self.users),
+                "pending_rebuilds": len(self.pending),
+                "catalog_version": self.catalog_version,
+                "oldest_feed_seconds": round(max(ages), 1) if ages else None,
+            }
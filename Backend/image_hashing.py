@@ -0,0 +1,106 @@
+# backend/image_hashing.py
+import io
+
+import numpy as np
+from PIL import Image
+
+# Hashes are 64-bit ints; two photos within this many differing bits are treated
+# as the same garment (re-shot from a slightly different angle or crop).
+# Hashes are computed on luminance only, so the same cut in another colour also
+# matches: callers must compare colours too.
+DUPLICATE_MAX_DISTANCE = 10
+# Within this many bits the photos are near-identical (re-upload, re-encode)
+IDENTICAL_MAX_DISTANCE = 3
+
+PHASH_SIZE = 32
+HASH_SIZE = 8
+
+
+def _grayscale(image_bytes, size):
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft("L", (size[0] * 4, size[1] * 4))  # cheap JPEG downscale while decoding
+    image = image.convert("L").resize(size, Image.Resampling.LANCZOS)
+    return np.asarray(image, dtype=np.float64)
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def phash(image_bytes):
+    """DCT perceptual hash: compares low-frequency coefficients against their median"""
+    pixels = _grayscale(image_bytes, (PHASH_SIZE, PHASH_SIZE))
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def dhash(image_bytes):
+    """Difference hash: whether each pixel is brighter than its right neighbour"""
+    pixels = _grayscale(image_bytes, (HASH_SIZE + 1, HASH_SIZE))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def hash_to_hex(value):
+    return f"{value:016x}"
+
+
+def hex_to_hash(text):
+    return int(text, 16)
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming-radius lookups"""
+
+    def __init__(self):
+        self.root = None  # [hash, item_id, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item_id):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, item_id, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item_id, {}]
+                return
+            node = child
+
+    def within(self, value, max_distance=DUPLICATE_MAX_DISTANCE):
+        """(distance, item_id) of every hash within max_distance, closest first"""
+        matches = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[1]))
+            # Triangle inequality: only children in [d - r, d + r] can match
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches, key=lambda match: match[0])
+
+    def __len__(self):
+        return self.size
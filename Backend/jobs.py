@@ -0,0 +1,364 @@
+# backend/jobs.py
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", str(24 * 3600)))
+# A claimed job is leased to its process and renewed while it runs; a lease that
+# runs out (the process died or hung) puts the job back on the queue
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_POLL_SECONDS = 1.0
+SSE_KEEPALIVE_SECONDS = 15.0
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, available_at);
+"""
+
+
+class QueueFull(Exception):
+    """The job queue already holds its maximum number of waiting jobs"""
+
+    def __init__(self, depth, retry_after=5):
+        super().__init__(f"job queue full ({depth} waiting)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+class RetryLater(Exception):
+    """Raised by a job handler to put its job back on the queue after delay seconds"""
+
+    def __init__(self, reason, delay=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.delay = delay
+
+
+class JobQueue:
+    """
+    Persistent FIFO of jobs in a local SQLite file, so queued work survives a
+    restart. Several processes (e.g. uvicorn --workers N) may share one file:
+    each claim leases the job to this queue's owner ID, and only jobs whose
+    lease ran out are requeued. Statements are short and serialised on one
+    connection per process.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, max_depth=JOB_QUEUE_MAX, lease=JOB_LEASE_SECONDS):
+        self.max_depth = max_depth
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def submit(self, kind, user_id, payload):
+        """Queue a job and return its ID; raises QueueFull past max_depth"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock:
+            depth = self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if depth >= self.max_depth:
+                raise QueueFull(depth)
+            self.conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, status, payload, created_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, user_id, QUEUED, json.dumps(payload), now, now)
+            )
+        return job_id
+
+    def claim(self):
+        """Lease the oldest runnable job to this process, mark it running and return it, or None"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = ? AND available_at <= ? "
+                "            ORDER BY available_at LIMIT 1) "
+                "RETURNING id, kind, payload, attempts, available_at, started_at",
+                (RUNNING, now, self.owner, now + self.lease, QUEUED, now)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def complete(self, job_id, result):
+        return self._finish(job_id, DONE, json.dumps(result), None)
+
+    def fail(self, job_id, error):
+        return self._finish(job_id, FAILED, None, error)
+
+    def _finish(self, job_id, status, result, error):
+        # The payload (base64 images) is no longer needed once a job is finished.
+        # Only the lease holder may finish a job: if our lease ran out, the job
+        # belongs to whoever claimed it next.
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, payload = '{}', "
+                "owner = NULL, lease_until = NULL WHERE id = ? AND status = ? AND owner = ?",
+                (status, result, error, time.time(), job_id, RUNNING, self.owner)
+            ).rowcount == 1
+
+    def retry(self, job_id, error, delay):
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, owner = NULL, lease_until = NULL "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (QUEUED, error, time.time() + delay, job_id, RUNNING, self.owner)
+            ).rowcount == 1
+
+    def renew(self):
+        """Extend the leases of every job this process is running"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = ? AND owner = ?",
+                (time.time() + self.lease, RUNNING, self.owner)
+            )
+
+    def release(self):
+        """Requeue the jobs this process was running, e.g. when it shuts down"""
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, owner = NULL, lease_until = NULL "
+                "WHERE status = ? AND owner = ?",
+                (QUEUED, time.time(), RUNNING, self.owner)
+            ).rowcount
+
+    def recover(self):
+        """Requeue running jobs whose lease ran out (their process died or hung); returns how many"""
+        now = time.time()
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, owner = NULL, lease_until = NULL "
+                "WHERE status = ? AND lease_until < ?",
+                (QUEUED, now, RUNNING, now)
+            ).rowcount
+
+    def purge(self, max_age=JOB_RESULT_TTL_SECONDS):
+        """Delete finished jobs older than max_age seconds"""
+        with self.lock:
+            return self.conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - max_age)
+            ).rowcount
+
+    def get(self, job_id):
+        """Public view of a job (no payload), or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, kind, status, result, error, attempts, created_at, available_at, "
+                "started_at, finished_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job["status"] == QUEUED:
+                job["queue_position"] = self.conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND available_at < ?",
+                    (QUEUED, job["available_at"])
+                ).fetchone()[0]
+        job = {"job_id": job.pop("id"), **job}
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def stats(self):
+        """Job counts by status, oldest queued created_at and earliest queued available_at"""
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self.conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            next_at = self.conn.execute("SELECT MIN(available_at) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+        return counts, oldest, next_at
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+class JobRunner:
+    """
+    Bounded pool of asyncio workers draining a JobQueue. handlers maps a job
+    kind to an async fn(payload, attempt) returning a JSON-serialisable
+    result; it may raise RetryLater to requeue the job.
+    """
+
+    def __init__(self, queue, handlers, workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.tasks = []
+        self.wakeup = None
+        self.listeners = {}              # job_id -> set of asyncio.Event for SSE streams
+        self.waits = deque(maxlen=1000)  # seconds between becoming runnable and starting
+        self.run_times = deque(maxlen=1000)
+        self.last_purge = 0.0
+        self.last_recover = 0.0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "retried": 0, "recovered": 0,
+                         "lost_leases": 0}
+
+    async def start(self):
+        self.wakeup = asyncio.Event()
+        self.counters["recovered"] += self.queue.recover()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        # Hand interrupted jobs back now rather than when their leases run out
+        self.queue.release()
+
+    def submit(self, kind, user_id, payload):
+        job_id = self.queue.submit(kind, user_id, payload)
+        self.counters["submitted"] += 1
+        if self.wakeup is not None:
+            self.wakeup.set()
+        return job_id
+
+    async def _worker(self):
+        while True:
+            # Cleared before claiming, so a submit that lands after an empty claim still wakes us
+            self.wakeup.clear()
+            job = self.queue.claim()
+            if job is None:
+                await self._idle()
+                continue
+            await self._run(job)
+
+    async def _heartbeat(self):
+        """Renew our leases well before they run out"""
+        while True:
+            await asyncio.sleep(self.queue.lease / 3)
+            self.queue.renew()
+
+    async def _idle(self):
+        now = time.time()
+        if now - self.last_purge > 3600:
+            self.last_purge = now
+            self.queue.purge()
+        if now - self.last_recover > self.queue.lease / 2:
+            # Pick up jobs from processes that died while this one keeps running
+            self.last_recover = now
+            self.counters["recovered"] += self.queue.recover()
+        _, _, next_at = self.queue.stats()
+        timeout = JOB_POLL_SECONDS if next_at is None else min(JOB_POLL_SECONDS, max(0.0, next_at - now))
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, job):
+        job_id = job["id"]
+        self.waits.append(job["started_at"] - job["available_at"])
+        self._notify(job_id)
+        start = time.monotonic()
+        try:
+            result = await self.handlers[job["kind"]](job["payload"], job["attempts"])
+        except RetryLater as e:
+            if job["attempts"] < self.max_attempts:
+                recorded = self.queue.retry(job_id, e.reason, e.delay)
+                outcome = "retried"
+            else:
+                recorded = self.queue.fail(job_id, e.reason)
+                outcome = "failed"
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            print(f"Job {job_id} ({job['kind']}) failed: {error}")
+            recorded = self.queue.fail(job_id, error)
+            outcome = "failed"
+        else:
+            recorded = self.queue.complete(job_id, result)
+            outcome = "completed"
+        # Not recorded: our lease ran out and the job was requeued for another run
+        self.counters[outcome if recorded else "lost_leases"] += 1
+        if outcome != "retried":
+            self.run_times.append(time.monotonic() - start)
+        self._notify(job_id)
+
+    def _notify(self, job_id):
+        for event in self.listeners.get(job_id, ()):
+            event.set()
+
+    async def events(self, job_id, keepalive=SSE_KEEPALIVE_SECONDS):
+        """
+        Server-sent events for one job: its state on every change, until it
+        finishes. Jobs run by this process notify the stream directly; the
+        queue is also polled every JOB_POLL_SECONDS for jobs run by another.
+        """
+        event = asyncio.Event()
+        self.listeners.setdefault(job_id, set()).add(event)
+        try:
+            last = None
+            last_sent = time.monotonic()
+            while True:
+                event.clear()
+                job = self.queue.get(job_id)
+                if job is None:
+                    return
+                state = (job["status"], job["attempts"])
+                if state != last:
+                    last = state
+                    last_sent = time.monotonic()
+                    yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                if job["status"] in (DONE, FAILED):
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - last_sent >= keepalive:
+                        last_sent = time.monotonic()
+                        yield ": keepalive\n\n"
+        finally:
+            self.listeners[job_id].discard(event)
+            if not self.listeners[job_id]:
+                del self.listeners[job_id]
+
+    def metrics(self):
+        counts, oldest, _ = self.queue.stats()
+        return {
+            **self.counters,
+            "workers": self.workers,
+            "queue_depth": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "oldest_queued_seconds": round(time.time() - oldest, 1) if oldest is not None else None,
+            "wait_p50_seconds": _percentile(self.waits, 0.5),
+            "wait_p95_seconds": _percentile(self.waits, 0.95),
+            "run_p50_seconds": _percentile(self.run_times, 0.5),
+            "sse_streams": sum(len(s) for s in self.listeners.values()),
+        }
@@ -1,5 +1,6 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import google.generativeai as genai  # CHANGED THIS LINE
 import base64
 import json
@@ -9,6 +10,15 @@ from dotenv import load_dotenv
 from pydantic import BaseModel
 from supabase import create_client, Client
 import uuid
+from PIL import UnidentifiedImageError
+
+from color_extraction import extract_dominant_colors, color_claim_is_plausible, colors_match, describe_colors
+from image_hashing import IDENTICAL_MAX_DISTANCE, BKTree, phash, hash_to_hex, hex_to_hash
+from jobs import JOB_MAX_ATTEMPTS, JobQueue, JobRunner, QueueFull, RetryLater
+from model_guard import GuardedModel, ModelRequestError, ModelUnavailable
+from prompt_encoding import encode_wardrobe, count_tokens
+from response_cache import ResponseCache, etag_matches
+from stub_model import StubModel
 
 # Load environment variables
 load_dotenv()
@@ -28,12 +38,28 @@ app.add_middleware(
 # Initialize Gemini
 genai.configure(api_key=os.getenv("GEMINI_API_KEY")) 
 model = genai.GenerativeModel('gemini-1.5-pro') 
+if os.getenv("MODEL_BACKEND") == "stub":
+    # Fault-injecting stand-in for local load and failure testing
+    model = StubModel.from_env()
+
+# All model calls go through the adaptive limiter / circuit breaker
+guarded_model = GuardedModel(model)
 
 # Initialize Supabase
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
 supabase: Client = create_client(supabase_url, supabase_key)
 
+# Response cache for read endpoints (in-process LRU + shared Redis-compatible tier)
+response_cache = ResponseCache()
+
+# Estimated Style DNA prompt sizes, reported by /api/metrics
+style_dna_prompts = {"prompts": 0, "tokens_total": 0, "tokens_max": 0, "rows_omitted": 0}
+
+# Long-running analyses can be submitted as jobs: a local SQLite queue drained by a
+# bounded worker pool (handlers are registered below, after the endpoints they serve)
+job_queue = JobQueue()
+
 # ==================== MODELS ====================
 class ColorAnalysisRequest(BaseModel):
     user_id: str
@@ -61,6 +87,9 @@ class WardrobeItemResponse(BaseModel):
     seasonality: List[str]
     style_tags: List[str]
     description: str
+    duplicate_of: Optional[str] = None
+    measured_colors: Optional[List[dict]] = []
+    color_verified: Optional[bool] = None
 
 class StyleDNARequest(BaseModel):
     user_id: str
@@ -100,39 +129,58 @@ def parse_gemini_json_response(response_text: str) -> dict:
         print(f"Response was: {response_text}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
 
+# Per-user perceptual-hash index of wardrobe photos, loaded lazily from the database
+wardrobe_hash_index: dict = {}
+
+def get_wardrobe_hash_index(user_id: str) -> BKTree:
+    """Return the user's BK-tree of wardrobe image hashes, building it on first use"""
+    if user_id not in wardrobe_hash_index:
+        tree = BKTree()
+        response = supabase.table("wardrobe_items")\
+            .select("id, image_hash")\
+            .eq("user_id", user_id)\
+            .execute()
+        for row in response.data or []:
+            if row.get("image_hash"):
+                tree.add(hex_to_hash(row["image_hash"]), row["id"])
+        wardrobe_hash_index[user_id] = tree
+    return wardrobe_hash_index[user_id]
+
+def latest_row(table: str, user_id: str) -> Optional[dict]:
+    """Most recent row for the user in table, or None"""
+    response = supabase.table(table)\
+        .select("*")\
+        .eq("user_id", user_id)\
+        .order("created_at", desc=True)\
+        .limit(1)\
+        .execute()
+    return response.data[0] if response.data else None
+
+def record_prompt_size(tokens: int, table_stats: dict):
+    """Add one Style DNA prompt's estimated size to the /api/metrics counters"""
+    style_dna_prompts["prompts"] += 1
+    style_dna_prompts["tokens_total"] += tokens
+    style_dna_prompts["tokens_max"] = max(style_dna_prompts["tokens_max"], tokens)
+    style_dna_prompts["rows_omitted"] += table_stats["distinct_rows"] - table_stats["rows_listed"]
+
+def model_unavailable_error(e: ModelUnavailable) -> HTTPException:
+    """503 with Retry-After for a model call that was refused or failed"""
+    return HTTPException(
+        status_code=503,
+        detail=f"AI model unavailable: {e.reason}",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def model_request_error(e: ModelRequestError) -> HTTPException:
+    """400 when the model rejected the input (bad image, blocked prompt), otherwise 500"""
+    if e.status is not None and 400 <= e.status < 500:
+        return HTTPException(status_code=400, detail=f"AI model rejected the request: {e.reason}")
+    return HTTPException(status_code=500, detail=f"AI model call failed: {e.reason}")
+
 # ==================== API ENDPOINTS ====================
 
 # 1. COLOR ANALYSIS ENDPOINT
-@app.post("/api/analyze-colors", response_model=ColorAnalysisResponse)
-async def analyze_colors(
-    user_id: str,
-    files: List[UploadFile] = File(...)
-):
-    """
-    Analyze user's photos for color season analysis
-    Requires: 2-5 photos of the user
-    """
-    if len(files) < 2 or len(files) > 5:
-        raise HTTPException(
-            status_code=400, 
-            detail="Please upload between 2 and 5 photos"
-        )
-    
-    try:
-        # Prepare images for Gemini
-        image_parts = []
-        for file in files:
-            if file.content_type not in ['image/jpeg', 'image/png', 'image/webp']:
-                raise HTTPException(status_code=400, detail=f"Invalid file type: {file.content_type}")
-            
-            encoded_image = encode_image_to_base64(file)
-            image_parts.append({
-                "mime_type": file.content_type,
-                "data": encoded_image
-            })
-        
-        # Prepare the prompt
-        prompt = """
+COLOR_ANALYSIS_PROMPT = """
         You are a professional personal stylist specializing in color analysis.
         
         Analyze these photos of the same person to determine their seasonal color palette.
@@ -162,58 +210,227 @@ async def analyze_colors(
         Make flattering colors specific (e.g., "emerald green" not just "green").
         Be honest about confidence. If unsure, use lower confidence_score.
         """
+
+COLOR_ANALYSIS_FIELDS = ["season", "confidence_score", "flattering_colors",
+                         "colors_to_avoid", "undertone", "reasoning"]
+
+def read_color_photos(files: List[UploadFile]) -> List[dict]:
+    """Validate the 2-5 uploaded photos and encode them as model image parts"""
+    if len(files) < 2 or len(files) > 5:
+        raise HTTPException(
+            status_code=400, 
+            detail="Please upload between 2 and 5 photos"
+        )
+    image_parts = []
+    for file in files:
+        if file.content_type not in ['image/jpeg', 'image/png', 'image/webp']:
+            raise HTTPException(status_code=400, detail=f"Invalid file type: {file.content_type}")
         
+        encoded_image = encode_image_to_base64(file)
+        image_parts.append({
+            "mime_type": file.content_type,
+            "data": encoded_image
+        })
+    return image_parts
+
+def store_color_analysis(user_id: str, response_text: str) -> dict:
+    """Parse and validate the model's answer, then save it for the user"""
+    result = parse_gemini_json_response(response_text)
+    
+    # Validate response structure
+    for field in COLOR_ANALYSIS_FIELDS:
+        if field not in result:
+            raise HTTPException(status_code=500, detail=f"AI response missing field: {field}")
+    
+    # Store in database
+    supabase.table("color_analysis").insert({
+        "user_id": user_id,
+        "season": result["season"],
+        "confidence_score": result["confidence_score"],
+        "flattering_colors": result["flattering_colors"],
+        "colors_to_avoid": result["colors_to_avoid"],
+        "undertone": result["undertone"],
+        "reasoning": result["reasoning"]
+    }).execute()
+    response_cache.invalidate_user(user_id)
+    return result
+
+@app.post("/api/analyze-colors", response_model=ColorAnalysisResponse)
+async def analyze_colors(
+    user_id: str,
+    http_response: Response,
+    files: List[UploadFile] = File(...)
+):
+    """
+    Analyze user's photos for color season analysis
+    Requires: 2-5 photos of the user
+    If the model is unavailable, the last stored analysis is returned with an
+    X-StyleSphere-Degraded header.
+    For clients that cannot hold the connection open, see /api/analyze-colors/jobs.
+    """
+    image_parts = read_color_photos(files)
+    
+    try:
         # Call Gemini
-        response = model.generate_content([prompt] + image_parts)
-        result = parse_gemini_json_response(response.text)
-        
-        # Validate response structure
-        required_fields = ["season", "confidence_score", "flattering_colors", 
-                          "colors_to_avoid", "undertone", "reasoning"]
-        for field in required_fields:
-            if field not in result:
-                raise HTTPException(status_code=500, detail=f"AI response missing field: {field}")
-        
-        # Store in database
-        supabase.table("color_analysis").insert({
-            "user_id": user_id,
-            "season": result["season"],
-            "confidence_score": result["confidence_score"],
-            "flattering_colors": result["flattering_colors"],
-            "colors_to_avoid": result["colors_to_avoid"],
-            "undertone": result["undertone"],
-            "reasoning": result["reasoning"]
-        }).execute()
-        
-        return result
-        
+        try:
+            response = await guarded_model.generate([COLOR_ANALYSIS_PROMPT] + image_parts)
+        except ModelUnavailable as e:
+            previous = latest_row("color_analysis", user_id)
+            if previous is None:
+                raise model_unavailable_error(e)
+            http_response.headers["X-StyleSphere-Degraded"] = e.reason
+            return previous
+        except ModelRequestError as e:
+            raise model_request_error(e)
+        
+        return store_color_analysis(user_id, response.text)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in color analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+async def run_color_analysis_job(payload: dict, attempt: int) -> dict:
+    """
+    Job handler for analyze_colors. While the model is unavailable the job is
+    requeued; on the last attempt it falls back to the stored analysis.
+    """
+    user_id = payload["user_id"]
+    try:
+        response = await guarded_model.generate([COLOR_ANALYSIS_PROMPT] + payload["image_parts"])
+    except ModelUnavailable as e:
+        if attempt < JOB_MAX_ATTEMPTS:
+            raise RetryLater(e.reason, e.retry_after)
+        previous = latest_row("color_analysis", user_id)
+        if previous is None:
+            raise
+        return {**{field: previous[field] for field in COLOR_ANALYSIS_FIELDS}, "degraded": e.reason}
+    return store_color_analysis(user_id, response.text)
+
+@app.post("/api/analyze-colors/jobs", status_code=202)
+async def submit_color_analysis(
+    user_id: str,
+    files: List[UploadFile] = File(...)
+):
+    """
+    Queue a color analysis and return its job ID straight away.
+    Poll /api/jobs/{job_id} or subscribe to /api/jobs/{job_id}/events (SSE)
+    for the result, which has the same fields as /api/analyze-colors.
+    """
+    image_parts = read_color_photos(files)
+    try:
+        job_id = job_runner.submit("analyze_colors", user_id, {"user_id": user_id, "image_parts": image_parts})
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis queue is full, try again shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events"
+    }
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status; result (or error) is set once status is done (or failed)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events with the job's state on every change, ending when it finishes"""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job_runner.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # 2. WARDROBE ITEM ANALYSIS ENDPOINT
 @app.post("/api/analyze-wardrobe-item", response_model=WardrobeItemResponse)
 async def analyze_wardrobe_item(
     user_id: str,
     category_hint: Optional[str] = None,
+    force: bool = False,
     file: UploadFile = File(...)
 ):
     """
-    Analyze a single clothing item from user's wardrobe
+    Analyze a single clothing item from user's wardrobe.
+    Photos that look like an item the user already has (similar shape and the
+    same colours) are still analysed and saved, with duplicate_of set, and
+    count once in the Style DNA.
+    Near-identical re-uploads return the stored analysis without a model call,
+    unless force=true.
     """
     try:
         # Validate image
         if file.content_type not in ['image/jpeg', 'image/png', 'image/webp']:
             raise HTTPException(status_code=400, detail="Invalid image format")
         
+        image_bytes = file.file.read()
+        file.file.seek(0)
+        
+        # Measure dominant colours locally so the model only has to name them,
+        # and hash the photo for the duplicate check
+        try:
+            measured_colors = extract_dominant_colors(image_bytes)
+            image_hash = phash(image_bytes)
+        except (UnidentifiedImageError, OSError):
+            raise HTTPException(status_code=400, detail="Could not decode image")
+        
+        # Check for a duplicate. The hash ignores colour, so the same cut in another
+        # colour matches too: take the closest match whose colours agree, falling
+        # back to one whose colours were never measured.
+        hash_index = get_wardrobe_hash_index(user_id)
+        matches = hash_index.within(image_hash)
+        duplicate = None
+        if matches:
+            stored = supabase.table("wardrobe_items")\
+                .select("*")\
+                .in_("id", [item_id for _, item_id in matches])\
+                .execute()
+            stored_items = {row["id"]: row for row in stored.data or []}
+            unmeasured = None
+            for distance, item_id in matches:
+                stored_item = stored_items.get(item_id)
+                if stored_item is None:
+                    continue
+                same_colors = colors_match(measured_colors, stored_item.get("measured_colors"))
+                if same_colors:
+                    duplicate = (distance, stored_item)
+                    break
+                if same_colors is None and unmeasured is None:
+                    unmeasured = (distance, stored_item)
+            duplicate = duplicate or unmeasured
+        duplicate_of = None
+        if duplicate:
+            distance, stored_item = duplicate
+            # Point at the original, not at an earlier re-shot of it
+            duplicate_of = stored_item.get("duplicate_of") or stored_item["id"]
+            if duplicate is not unmeasured and distance <= IDENTICAL_MAX_DISTANCE and not force:
+                return {**stored_item, "duplicate_of": duplicate_of,
+                        "measured_colors": stored_item.get("measured_colors")}
+        
         encoded_image = encode_image_to_base64(file)
         
         # Prepare prompt based on category hint
         category_context = f"The user says this might be a {category_hint}." if category_hint else ""
+        color_context = (
+            f"Measured garment colours (from pixels, largest first): {describe_colors(measured_colors)}. "
+            "Base primary_color and secondary_colors on these."
+        ) if measured_colors else ""
         
         prompt = f"""
         You are a fashion expert analyzing a clothing item.
         {category_context}
+        {color_context}
         
         Analyze this clothing item image thoroughly.
         
@@ -239,10 +456,15 @@ async def analyze_wardrobe_item(
         - If uncertain about fit, estimate based on silhouette
         """
         
-        response = model.generate_content([prompt, {
-            "mime_type": file.content_type,
-            "data": encoded_image
-        }])
+        try:
+            response = await guarded_model.generate([prompt, {
+                "mime_type": file.content_type,
+                "data": encoded_image
+            }])
+        except ModelUnavailable as e:
+            raise model_unavailable_error(e)
+        except ModelRequestError as e:
+            raise model_request_error(e)
         
         result = parse_gemini_json_response(response.text)
         
@@ -262,20 +484,36 @@ async def analyze_wardrobe_item(
             "formality_level": result["formality_level"],
             "seasonality": result["seasonality"],
             "style_tags": result["style_tags"],
-            "description": result["description"]
+            "description": result["description"],
+            "image_hash": hash_to_hex(image_hash),
+            "measured_colors": measured_colors,
+            "duplicate_of": duplicate_of
         }).execute()
         
-        return result
+        if db_result.data:
+            hash_index.add(image_hash, db_result.data[0]["id"])
+        response_cache.invalidate_user(user_id)
+        
+        return {
+            **result,
+            "duplicate_of": duplicate_of,
+            "measured_colors": measured_colors,
+            "color_verified": color_claim_is_plausible(result["primary_color"], measured_colors)
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in wardrobe analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Item analysis failed: {str(e)}")
 
 # 3. GENERATE STYLE DNA ENDPOINT
 @app.post("/api/generate-style-dna", response_model=StyleDNAResponse)
-async def generate_style_dna(request: StyleDNARequest):
+async def generate_style_dna(request: StyleDNARequest, http_response: Response):
     """
     Generate overall style profile from all wardrobe items
+    If the model is unavailable, the last stored style DNA is returned with an
+    X-StyleSphere-Degraded header.
     """
     try:
         # Fetch user's wardrobe items from database
@@ -287,28 +525,18 @@ async def generate_style_dna(request: StyleDNARequest):
         if not response.data:
             raise HTTPException(status_code=404, detail="No wardrobe items found")
         
-        wardrobe_items = response.data
+        # Re-shot photos of a garment the user already has count once
+        wardrobe_items = [item for item in response.data if not item.get("duplicate_of")]
         
-        # Prepare data for Gemini
-        items_summary = []
-        for item in wardrobe_items:
-            items_summary.append({
-                "category": item["category"],
-                "subcategory": item["subcategory"],
-                "primary_color": item["primary_color"],
-                "pattern": item["pattern"],
-                "fit": item["fit"],
-                "formality_level": item["formality_level"],
-                "style_tags": item["style_tags"]
-            })
-        
-        items_json = json.dumps(items_summary, indent=2)
+        # Prepare data for Gemini: a compact table of distinct items with counts,
+        # sampled to a fixed token budget
+        items_table, table_stats = encode_wardrobe(wardrobe_items)
         
         prompt = f"""
         You are a personal stylist with years of experience in the fashion industry, analyzing a client's entire wardrobe to understand their style DNA and the choices they make when it comes to dressing up based on the type of event.
         
-        WARDROBE ITEMS:
-        {items_json}
+        WARDROBE ITEMS (pipe-separated, one row per distinct item, count = how many they own; style_tags separated by ;):
+{items_table}
         
         Analyze this wardrobe to understand the person's style personality.
         
@@ -339,8 +567,18 @@ async def generate_style_dna(request: StyleDNARequest):
         Be honest. If their wardrobe is minimal, say so.
         If they have conflicting styles, note they're experimental.
         """
-        
-        response = model.generate_content([prompt])
+        record_prompt_size(count_tokens(prompt), table_stats)
+        
+        try:
+            response = await guarded_model.generate([prompt])
+        except ModelUnavailable as e:
+            previous = latest_row("style_dna", request.user_id)
+            if previous is None:
+                raise model_unavailable_error(e)
+            http_response.headers["X-StyleSphere-Degraded"] = e.reason
+            return previous
+        except ModelRequestError as e:
+            raise model_request_error(e)
         result = parse_gemini_json_response(response.text)
         
         # Store in database
@@ -356,17 +594,38 @@ async def generate_style_dna(request: StyleDNARequest):
             "style_summary": result["style_summary"],
             "top_style_tags": result["top_style_tags"]
         }).execute()
+        response_cache.invalidate_user(request.user_id)
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in style DNA generation: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Style DNA generation failed: {str(e)}")
 
 # 4. GET USER PROFILE ENDPOINT
 @app.get("/api/user-profile/{user_id}")
-async def get_user_profile(user_id: str):
-    """Get complete user profile with color analysis and style DNA"""
+async def get_user_profile(user_id: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Get complete user profile with color analysis and style DNA.
+    Responses carry an ETag; a matching If-None-Match returns 304 with no body.
+    """
+    cache_key = ResponseCache.key("user-profile", user_id)
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        # Read the version before the database, so a profile read before a
+        # concurrent write is not cached after that write invalidates it
+        version = response_cache.version(user_id)
+        cached = response_cache.set(cache_key, fetch_user_profile(user_id), user_id, version)
+    
+    etag, body = cached
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def fetch_user_profile(user_id: str) -> dict:
+    """Read the profile from the database (three queries)"""
     try:
         # Fetch color analysis
         color_response = supabase.table("color_analysis")\
@@ -399,6 +658,34 @@ async def get_user_profile(user_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch profile: {str(e)}")
 
+# 5. METRICS ENDPOINT
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Model guard state (concurrency limit, circuit breaker, counters), job queue
+    depth and wait times, and estimated Style DNA prompt sizes
+    """
+    prompts = style_dna_prompts["prompts"]
+    return {
+        "model": guarded_model.metrics(),
+        "jobs": job_runner.metrics(),
+        "style_dna_prompt": {
+            **style_dna_prompts,
+            "tokens_mean": round(style_dna_prompts["tokens_total"] / prompts) if prompts else None
+        }
+    }
+
+# ==================== BACKGROUND JOBS ====================
+job_runner = JobRunner(job_queue, {"analyze_colors": run_color_analysis_job})
+
+@app.on_event("startup")
+async def start_job_runner():
+    await job_runner.start()
+
+@app.on_event("shutdown")
+async def stop_job_runner():
+    await job_runner.stop()
+
 # Health check
 @app.get("/")
 async def root():
@@ -0,0 +1,255 @@
+# backend/model_guard.py
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+MODEL_DEADLINE_SECONDS = float(os.getenv("MODEL_DEADLINE_SECONDS", "30"))
+MODEL_QUEUE_TIMEOUT_SECONDS = float(os.getenv("MODEL_QUEUE_TIMEOUT_SECONDS", "2"))
+MODEL_LATENCY_TARGET_SECONDS = float(os.getenv("MODEL_LATENCY_TARGET_SECONDS", "12"))
+MODEL_INITIAL_CONCURRENCY = int(os.getenv("MODEL_INITIAL_CONCURRENCY", "8"))
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "32"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+
+class ModelUnavailable(Exception):
+    """The model call was not made or did not finish: overloaded, circuit open, deadline or upstream error"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ModelRequestError(Exception):
+    """The model rejected this request (bad image, blocked prompt, 4xx); not the upstream's fault"""
+
+    def __init__(self, reason, status=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+
+
+def error_status(e):
+    """HTTP status of a model-client error: its code attribute, or a leading 'NNN ' in the message"""
+    status = getattr(e, "code", None) or getattr(e, "status_code", None)
+    if isinstance(status, int):
+        return status
+    match = re.match(r"\s*(\d{3})\b", str(e))
+    return int(match.group(1)) if match else None
+
+
+def is_upstream_failure(e):
+    """Timeouts, connection errors, 429 and 5xx count against the upstream; anything else is the request's fault"""
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    status = error_status(e)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit for one event loop. Additive increase
+    (+1 per limit's worth of fast successes), multiplicative decrease on
+    errors, timeouts and slow responses.
+    """
+
+    def __init__(self, initial=MODEL_INITIAL_CONCURRENCY, min_limit=1, max_limit=MODEL_MAX_CONCURRENCY,
+                 latency_target=MODEL_LATENCY_TARGET_SECONDS, backoff=0.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self.waiters = deque()
+
+    async def acquire(self, timeout):
+        """Take a slot, waiting up to timeout seconds; raises ModelUnavailable if none frees up"""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException as e:  # timed out, or the caller was cancelled
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we gave up; hand it back
+                self.release()
+            else:
+                waiter.cancel()
+                self.waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise ModelUnavailable("model concurrency limit reached", retry_after=2) from None
+            raise
+
+    def release(self):
+        """Free a slot and wake waiters that now fit under the limit"""
+        self.in_flight -= 1
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self, latency):
+        if latency > self.latency_target:
+            self.on_overload()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_overload(self):
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after a cool-down lets one probe call through"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def retry_after(self):
+        return max(1, int(self.opened_at + self.reset_timeout - time.monotonic()) + 1)
+
+    def rejecting(self):
+        """True while open and still cooling down (cheap check before queueing)"""
+        return self.state == self.OPEN and time.monotonic() < self.opened_at + self.reset_timeout
+
+    def allow(self):
+        if self.state == self.OPEN and not self.rejecting():
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+        return self.state == self.CLOSED
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def end_probe(self):
+        """The probe finished without telling us anything about the upstream (cancelled, bad request)"""
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+
+class GuardedModel:
+    """
+    Wraps a model client (anything with generate_content) with an adaptive
+    concurrency limit, per-call deadlines and a circuit breaker. Blocking
+    model calls run on a dedicated thread pool so the event loop stays free.
+    """
+
+    def __init__(self, model, limiter=None, breaker=None, deadline=MODEL_DEADLINE_SECONDS,
+                 queue_timeout=MODEL_QUEUE_TIMEOUT_SECONDS):
+        self.model = model
+        self.limiter = limiter or AIMDLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.deadline = deadline
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.limiter.max_limit * 2,
+                                           thread_name_prefix="model")
+        self.counters = {
+            "calls": 0, "successes": 0, "errors": 0, "timeouts": 0,
+            "rejected": 0, "short_circuited": 0, "bad_requests": 0, "cancelled": 0,
+        }
+        self.latency_ewma = None
+
+    async def generate(self, parts, deadline=None):
+        """
+        generate_content(parts) under the guard. Raises ModelUnavailable instead
+        of hanging or when the upstream fails, ModelRequestError when it rejects
+        the request itself (which does not count against the upstream).
+        """
+        self.counters["calls"] += 1
+        if self.breaker.rejecting():
+            self.counters["short_circuited"] += 1
+            raise ModelUnavailable("model circuit open", retry_after=self.breaker.retry_after())
+
+        try:
+            await self.limiter.acquire(self.queue_timeout)
+        except ModelUnavailable:
+            self.counters["rejected"] += 1
+            raise
+        if not self.breaker.allow():
+            self.limiter.release()
+            self.counters["short_circuited"] += 1
+            raise ModelUnavailable("model circuit open", retry_after=self.breaker.retry_after())
+        is_probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        loop = asyncio.get_running_loop()
+        call = loop.run_in_executor(self.executor, self.model.generate_content, parts)
+        start = time.monotonic()
+        finished = False
+        try:
+            response = await asyncio.wait_for(asyncio.shield(call), deadline or self.deadline)
+            finished = True
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            self._record_failure()
+            raise ModelUnavailable("model deadline exceeded", retry_after=5)
+        except asyncio.CancelledError:
+            self.counters["cancelled"] += 1
+            raise
+        except Exception as e:
+            finished = True
+            if is_upstream_failure(e):
+                self.counters["errors"] += 1
+                self._record_failure()
+                raise ModelUnavailable(f"model error: {str(e)}", retry_after=5) from e
+            self.counters["bad_requests"] += 1
+            raise ModelRequestError(str(e), error_status(e)) from e
+        finally:
+            if is_probe:
+                self.breaker.end_probe()
+            if finished:
+                self.limiter.release()
+            else:
+                # Deadline or cancelled caller: the thread keeps running and its slot is
+                # only freed when it really finishes, so a hung upstream shrinks the
+                # usable concurrency instead of piling up.
+                call.add_done_callback(lambda _: self.limiter.release())
+
+        latency = time.monotonic() - start
+        self.counters["successes"] += 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        self.breaker.record_success()
+        self.limiter.on_success(latency)
+        return response
+
+    def _record_failure(self):
+        self.breaker.record_failure()
+        self.limiter.on_overload()
+
+    def metrics(self):
+        return {
+            **self.counters,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "queued": len(self.limiter.waiters),
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+        }
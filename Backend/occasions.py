@@ -0,0 +1,155 @@
+# backend/occasions.py
+import numpy as np
+
+# Vocabularies shared with the wardrobe prompt and the scrapers
+SEASONS = ["summer", "winter", "spring", "autumn", "all-season"]
+STYLE_TAGS = [
+    "minimalist", "streetwear", "bohemian", "classic", "edgy", "preppy",
+    "athleisure", "casual", "trendy", "formal", "elegant",
+]
+
+# Occasion model: formality range (1-10), suitable seasons and style tag priors (0-1)
+OCCASIONS = {
+    "casual": {
+        "formality": (1, 4),
+        "seasonality": ["all-season"],
+        "tags": {"casual": 1.0, "minimalist": 0.6, "streetwear": 0.6, "athleisure": 0.4, "trendy": 0.4},
+    },
+    "office": {
+        "formality": (5, 8),
+        "seasonality": ["all-season"],
+        "tags": {"classic": 1.0, "minimalist": 0.8, "preppy": 0.6, "formal": 0.6, "elegant": 0.4},
+    },
+    "wedding": {
+        "formality": (7, 10),
+        "seasonality": ["all-season"],
+        "tags": {"elegant": 1.0, "formal": 0.8, "classic": 0.6, "bohemian": 0.3},
+    },
+    "party": {
+        "formality": (4, 8),
+        "seasonality": ["all-season"],
+        "tags": {"trendy": 1.0, "edgy": 0.8, "elegant": 0.6, "streetwear": 0.3},
+    },
+    "date": {
+        "formality": (4, 7),
+        "seasonality": ["all-season"],
+        "tags": {"elegant": 0.8, "trendy": 0.8, "classic": 0.6, "minimalist": 0.4},
+    },
+    "formal": {
+        "formality": (8, 10),
+        "seasonality": ["all-season"],
+        "tags": {"formal": 1.0, "classic": 0.8, "elegant": 0.8},
+    },
+    "festive": {
+        "formality": (5, 9),
+        "seasonality": ["winter", "autumn"],
+        "tags": {"elegant": 0.8, "bohemian": 0.6, "trendy": 0.4, "classic": 0.4},
+    },
+    "beach": {
+        "formality": (1, 3),
+        "seasonality": ["summer", "spring"],
+        "tags": {"bohemian": 1.0, "casual": 0.8, "minimalist": 0.4},
+    },
+    "gym": {
+        "formality": (1, 2),
+        "seasonality": ["all-season"],
+        "tags": {"athleisure": 1.0, "casual": 0.6, "streetwear": 0.3},
+    },
+}
+
+# Style DNA formality_range -> occasion used when the shopping intent has none
+FORMALITY_RANGE_OCCASIONS = {
+    "casual": "casual",
+    "smart-casual": "office",
+    "formal": "formal",
+}
+
+# Points awarded by occasion scoring. Colour, tags and budget already reach 80,
+# so the occasion adds at most 20 and strong matches stay below the 100 clamp.
+# Season points only apply to seasonal occasions; a bonus every product gets
+# for an all-season occasion would not change the ranking.
+FORMALITY_MATCH_POINTS = 10
+FORMALITY_MISS_PER_STEP = 5
+SEASON_MATCH_POINTS = 5
+TAG_PRIOR_POINTS = 5
+TAG_PRIOR_CAP = 5
+
+# ==================== PRECOMPUTED ARRAYS ====================
+# Everything below is indexed by occasion ID so a batched scoring pass
+# only does array lookups, never per-product branching.
+OCCASION_NAMES = list(OCCASIONS)
+OCCASION_IDS = {name: i for i, name in enumerate(OCCASION_NAMES)}
+SEASON_BITS = {season: 1 << i for i, season in enumerate(SEASONS)}
+ALL_SEASONS = SEASON_BITS["all-season"]
+TAG_IDS = {tag: i for i, tag in enumerate(STYLE_TAGS)}
+
+
+def season_mask(seasonality):
+    """Pack a seasonality list (or single string) into a bitmask"""
+    if isinstance(seasonality, str):
+        seasonality = [seasonality]
+    mask = 0
+    for season in seasonality or []:
+        mask |= SEASON_BITS.get(season, 0)
+    return mask
+
+
+FORMALITY_LOW = np.array([OCCASIONS[n]["formality"][0] for n in OCCASION_NAMES], dtype=np.int8)
+FORMALITY_HIGH = np.array([OCCASIONS[n]["formality"][1] for n in OCCASION_NAMES], dtype=np.int8)
+SEASON_MASKS = np.array([season_mask(OCCASIONS[n]["seasonality"]) for n in OCCASION_NAMES], dtype=np.uint8)
+TAG_PRIORS = np.zeros((len(OCCASION_NAMES), len(STYLE_TAGS)), dtype=np.float64)
+for _name in OCCASION_NAMES:
+    for _tag, _weight in OCCASIONS[_name]["tags"].items():
+        TAG_PRIORS[OCCASION_IDS[_name], TAG_IDS[_tag]] = _weight
+
+
+def resolve_occasion(shopping_intent, user_profile):
+    """Occasion ID for this request, falling back to the Style DNA formality range"""
+    occasion = (shopping_intent.get("occasion") or "").lower()
+    if occasion in OCCASION_IDS:
+        return OCCASION_IDS[occasion]
+    fallback = FORMALITY_RANGE_OCCASIONS.get(user_profile["style_dna"].get("formality_range"))
+    return OCCASION_IDS[fallback] if fallback else None
+
+
+def formality_points(occasion_id, formality):
+    """Formality component for a single product"""
+    low, high = int(FORMALITY_LOW[occasion_id]), int(FORMALITY_HIGH[occasion_id])
+    if low <= formality <= high:
+        return FORMALITY_MATCH_POINTS
+    distance = low - formality if formality < low else formality - high
+    return -FORMALITY_MISS_PER_STEP * distance
+
+
+def occasion_style_points(occasion_id, product_season_mask, tags):
+    """Seasonality and tag-prior component for a single product"""
+    points = 0
+    occasion_mask = int(SEASON_MASKS[occasion_id])
+    if not occasion_mask & ALL_SEASONS and product_season_mask & (occasion_mask | ALL_SEASONS):
+        points += SEASON_MATCH_POINTS
+    prior = sum(TAG_PRIORS[occasion_id, TAG_IDS[t]] for t in set(tags) if t in TAG_IDS)
+    return points + min(TAG_PRIOR_POINTS * prior, TAG_PRIOR_CAP)
+
+
+def formality_points_batch(occasion_id, formality):
+    """Vectorized formality_points over an array of formality levels"""
+    formality = formality.astype(np.int16)
+    low = np.int16(FORMALITY_LOW[occasion_id])
+    high = np.int16(FORMALITY_HIGH[occasion_id])
+    distance = np.maximum(low - formality, 0) + np.maximum(formality - high, 0)
+    return np.where(distance == 0, FORMALITY_MATCH_POINTS, -FORMALITY_MISS_PER_STEP * distance)
+
+
+def occasion_style_points_batch(occasion_id, season_masks, tag_matrix):
+    """
+    Vectorized occasion_style_points.
+    tag_matrix is a multi-hot (n_products, len(STYLE_TAGS)) array.
+    """
+    occasion_mask = int(SEASON_MASKS[occasion_id])
+    if occasion_mask & ALL_SEASONS:
+        season = np.zeros(len(season_masks), dtype=np.float64)
+    else:
+        fits = (season_masks & (occasion_mask | ALL_SEASONS)) != 0
+        season = fits * float(SEASON_MATCH_POINTS)
+    prior = tag_matrix @ TAG_PRIORS[occasion_id]
+    return season + np.minimum(TAG_PRIOR_POINTS * prior, TAG_PRIOR_CAP)
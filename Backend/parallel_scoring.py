@@ -0,0 +1,180 @@
+# backend/parallel_scoring.py
+import asyncio
+import heapq
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+
+from catalog import COLUMN_NAMES
+from recommendation import build_score_query, score_columns, top_k_indices
+
+# Catalogs smaller than this are scored in-process; below it the cost of
+# shipping work to other processes outweighs the parallel speedup.
+PARALLEL_MIN_PRODUCTS = int(os.getenv("PARALLEL_SCORING_MIN_PRODUCTS", "50000"))
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "0")) or os.cpu_count() or 1
+# Spare rows allocated in shared memory, so catalog deltas that insert
+# products can be written in place instead of re-allocating
+SHARED_HEADROOM = 0.1
+
+# Per-worker view of the shared catalog, set up by _attach_catalog.
+# Spawned workers share the parent's resource tracker, so only the parent unlinks.
+_worker_blocks = []
+_worker_columns = None
+
+
+class SharedCatalog:
+    """
+    Copies the scoring columns of a ProductColumns into shared memory blocks
+    with room for capacity rows; rows past len(columns) are spare.
+    """
+
+    def __init__(self, columns, capacity=None):
+        self.capacity = max(capacity or 0, len(columns))
+        self.blocks = []
+        self.arrays = {}
+        self.spec = {}
+        for name in COLUMN_NAMES:
+            array = getattr(columns, name)
+            shape = (self.capacity,) + array.shape[1:]
+            block = shared_memory.SharedMemory(
+                create=True, size=max(int(np.prod(shape)) * array.dtype.itemsize, 1)
+            )
+            shared = np.ndarray(shape, dtype=array.dtype, buffer=block.buf)
+            shared[:len(array)] = array
+            self.blocks.append(block)
+            self.arrays[name] = shared
+            self.spec[name] = (block.name, shape, array.dtype.str)
+
+    def write_rows(self, columns, rows):
+        """Copy these rows of columns into shared memory (rows < capacity)"""
+        for name, shared in self.arrays.items():
+            shared[rows] = getattr(columns, name)[rows]
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def _attach_catalog(spec):
+    """Worker initializer: map the shared catalog arrays without copying"""
+    global _worker_columns
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    _worker_columns = arrays
+
+
+def _score_partition(start, stop, query, k):
+    """Score rows [start, stop) and return that partition's top-k as (score, index) pairs"""
+    part = SimpleNamespace(**{name: array[start:stop] for name, array in _worker_columns.items()})
+    scores = score_columns(part, query)
+    top = top_k_indices(scores, k)
+    return [(float(scores[i]), start + int(i)) for i in top]
+
+
+class ParallelScorer:
+    """
+    Scores a catalog across worker processes that read a shared-memory copy of
+    its columns. Small catalogs stay in-process. Once a delta is applied to the
+    columns the copy is stale, and scoring runs in-process, until apply_delta()
+    writes the changed rows into it (catalog_sync.refresh_catalog does this).
+    Call close() when the scorer is no longer needed.
+    """
+
+    def __init__(self, columns, workers=SCORING_WORKERS, min_products=PARALLEL_MIN_PRODUCTS):
+        self.workers = workers
+        self.min_products = min_products
+        self.shared = None
+        self.pool = None
+        self._share(columns)
+
+    def _share(self, columns):
+        self.columns = columns
+        self.version = columns.version
+        if len(columns) >= self.min_products and self.workers > 1:
+            self.shared = SharedCatalog(columns, int(len(columns) * (1 + SHARED_HEADROOM)))
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_attach_catalog,
+                initargs=(self.shared.spec,),
+            )
+
+    def rebuild(self, columns=None):
+        """Re-copy the (patched or replaced) columns into fresh shared memory and workers"""
+        columns = columns if columns is not None else self.columns
+        self.close()
+        self._share(columns)
+
+    def apply_delta(self, columns, changed_rows, deleted_rows):
+        """
+        Bring the shared copy up to date after columns.apply_delta returned
+        (changed_rows, deleted_rows). The rows are written in place; the
+        copy is only re-allocated when inserts outgrow its spare rows (or
+        the catalog grows large enough to score in parallel).
+        """
+        if columns is not self.columns or columns.version != self.version + 1:
+            # Not the delta that follows our copy; nothing to patch from
+            self.rebuild(columns)
+        elif self.shared is None:
+            if len(columns) >= self.min_products and self.workers > 1:
+                self.rebuild()
+            else:
+                self.version = columns.version
+        elif len(columns) > self.shared.capacity:
+            self.rebuild()
+        else:
+            self.shared.write_rows(columns, np.concatenate([changed_rows, deleted_rows]))
+            self.version = columns.version
+
+    @property
+    def stale(self):
+        """The columns changed (apply_delta) since they were copied to shared memory"""
+        return self.columns.version != self.version
+
+    @property
+    def parallel(self):
+        return self.pool is not None and not self.stale
+
+    async def top_k(self, user_profile, shopping_intent, k):
+        """
+        Indices and scores of the k best products, best first. The event loop
+        keeps running while the worker processes score their partitions.
+        """
+        query = build_score_query(user_profile, self.columns, shopping_intent)
+
+        if not self.parallel:
+            scores = score_columns(self.columns, query)
+            top = top_k_indices(scores, k)
+            return top, scores[top]
+
+        bounds = np.linspace(0, len(self.columns), self.workers + 1, dtype=np.int64)
+        partitions = await asyncio.gather(*(
+            asyncio.wrap_future(self.pool.submit(_score_partition, int(start), int(stop), query, k))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ))
+        # Merge the per-partition top-k lists; ties go to the lower index
+        best = heapq.nsmallest(
+            k, (pair for partition in partitions for pair in partition),
+            key=lambda pair: (-pair[0], pair[1]),
+        )
+        return (np.array([i for _, i in best], dtype=np.int64),
+                np.array([s for s, _ in best], dtype=np.float64))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
@@ -0,0 +1,120 @@
+# backend/prompt_encoding.py
+import os
+import re
+from collections import Counter, defaultdict
+
+# Token budget for the wardrobe table inside the Style DNA prompt
+WARDROBE_TOKEN_BUDGET = int(os.getenv("STYLE_DNA_WARDROBE_TOKEN_BUDGET", "1500"))
+
+WARDROBE_COLUMNS = ("category", "subcategory", "primary_color", "pattern", "fit", "formality_level", "style_tags")
+
+# Words, numbers, newlines, indentation runs and single punctuation marks.
+# A single space before a word is folded into that word's token.
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|\n|[ \t]{2,}|[^\sA-Za-z\d]")
+_CHARS_PER_PIECE = 4
+_SPACES_PER_PIECE = 16
+
+
+def count_tokens(text):
+    """
+    Local estimate of model tokens (no network call), modelled on a
+    SentencePiece vocabulary like Gemini's: one token per number, punctuation
+    mark or newline, one per run of up to 16 spaces/tabs, one per short word
+    and roughly one per 4 characters of longer words.
+    Not calibrated against Gemini's tokenizer (none is available offline);
+    benchmarks/bench_prompt_tokens.py compares it with model.count_tokens
+    when GEMINI_API_KEY is set.
+    """
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece[0] in " \t":
+            tokens += -(-len(piece) // _SPACES_PER_PIECE)
+        else:
+            tokens += 1 if len(piece) <= _CHARS_PER_PIECE + 2 else -(-len(piece) // _CHARS_PER_PIECE)
+    return tokens
+
+
+def _cell(value):
+    if isinstance(value, (list, tuple)):
+        # Sorted so the same tags in a different order group together
+        return ";".join(sorted(str(v) for v in value))
+    return "" if value is None else str(value).replace("|", "/")
+
+
+def _group_items(items):
+    """Distinct rows with how many wardrobe items share them, most common first"""
+    counts = Counter(tuple(_cell(item.get(c)) for c in WARDROBE_COLUMNS) for item in items)
+    return counts.most_common()
+
+
+def _sample_groups(groups, max_rows):
+    """
+    Representative subset: round-robin across categories so every category
+    stays visible, taking each category's most common rows first.
+    """
+    by_category = defaultdict(list)
+    for row, count in groups:
+        by_category[row[0]].append((row, count))
+    queues = sorted(by_category.values(), key=lambda rows: -sum(c for _, c in rows))
+    sampled = []
+    while len(sampled) < max_rows and any(queues):
+        for queue in queues:
+            if queue and len(sampled) < max_rows:
+                sampled.append(queue.pop(0))
+    return sampled
+
+
+def _summary_lines(items):
+    """Exact aggregates over the whole wardrobe, so sampling does not skew them"""
+    total = len(items)
+    categories = Counter(item.get("category") for item in items)
+    patterned = sum(1 for item in items if item.get("pattern") not in (None, "solid"))
+    formality = [item["formality_level"] for item in items if isinstance(item.get("formality_level"), (int, float))]
+    colors = Counter(item.get("primary_color") for item in items)
+    tags = Counter(tag for item in items for tag in item.get("style_tags") or [])
+    lines = [
+        f"total_items={total}",
+        "categories=" + ",".join(f"{k}:{v}" for k, v in categories.most_common()),
+        "top_colors=" + ",".join(f"{k}:{v}" for k, v in colors.most_common(6)),
+        "top_style_tags=" + ",".join(f"{k}:{v}" for k, v in tags.most_common(8)),
+        f"patterned_share={patterned / total:.0%}",
+    ]
+    if formality:
+        lines.append(f"avg_formality={sum(formality) / len(formality):.1f}")
+    return lines
+
+
+def encode_wardrobe(items, token_budget=WARDROBE_TOKEN_BUDGET):
+    """
+    Compact, pipe-separated table of wardrobe items for prompts: a header row,
+    one row per distinct item with a count column, and exact summary stats.
+    Rows are sampled to fit token_budget. Returns (text, stats).
+    """
+    groups = _group_items(items)
+    header = "|".join(WARDROBE_COLUMNS + ("count",))
+    summary = "\n".join(_summary_lines(items)) if items else "total_items=0"
+    row_tokens = {row: count_tokens("|".join(row + (str(count),))) + 1 for row, count in groups}
+
+    fixed_tokens = count_tokens(header) + count_tokens(summary) + 20  # + omission note
+    if fixed_tokens + sum(row_tokens.values()) <= token_budget:
+        kept = groups
+    else:
+        average = sum(row_tokens.values()) / len(row_tokens)
+        kept = _sample_groups(groups, max(1, int((token_budget - fixed_tokens) / average)))
+        # Trim further if the sampled rows happen to be longer than average
+        used = fixed_tokens + sum(row_tokens[row] for row, _ in kept)
+        while len(kept) > 1 and used > token_budget:
+            used -= row_tokens[kept.pop()[0]]
+
+    kept_items = sum(count for _, count in kept)
+    lines = [header] + ["|".join(row + (str(count),)) for row, count in kept]
+    if kept_items < len(items):
+        lines.append(f"({len(items) - kept_items} more items not listed; summary covers all)")
+    text = "\n".join(lines) + "\n" + summary
+    return text, {
+        "items": len(items),
+        "distinct_rows": len(groups),
+        "rows_listed": len(kept),
+        "tokens": count_tokens(text),
+    }
@@ -1,5 +1,21 @@
 # backend/recommendation.py
-def get_recommendations(user_id, shopping_intent):
+import numpy as np
+
+from catalog import DEFAULT_FORMALITY, ProductColumns
+from explanations import (
+    PALETTE_HIT, PALETTE_CLASH, TAG_OVERLAP, BUDGET_FIT, OVER_BUDGET,
+    FORMALITY, FORMALITY_MISMATCH, OCCASION_STYLE,
+    record, generate_explanation, rewrite_explanations,
+)
+from occasions import (
+    OCCASION_NAMES, STYLE_TAGS, resolve_occasion, season_mask,
+    formality_points, occasion_style_points,
+    formality_points_batch, occasion_style_points_batch,
+)
+from records import Product, ScoreResult
+
+async def get_recommendations(user_id, shopping_intent, top_k=10, rewrite_model=None, scorer=None,
+                              feeds=None):
     """
     shopping_intent example:
     {
@@ -9,53 +25,202 @@ def get_recommendations(user_id, shopping_intent):
         "stores": ["myntra", "amazon"],
         "color_preference": "pink"
     }
+
+    Explanations are rendered from templates only for the final top_k.
+    Pass rewrite_model (a model_guard.GuardedModel) to polish them with one
+    batched model call.
+    Pass a parallel_scoring.ParallelScorer to rank its preloaded catalog instead
+    of fetching and scoring products in this process.
+    Pass a feeds.FeedStore to serve precomputed feeds for common intents.
     """
     # 1. Get user profile
     user_profile = get_user_profile(user_id)  # From Layer 1
     
-    # 2. Get products from database
-    products = get_products_from_db(shopping_intent)
+    # Precomputed feed for a common intent, if one is fresh
+    if feeds is not None:
+        hit = feeds.lookup(user_id, user_profile, shopping_intent, top_k)
+        if hit is not None:
+            feed, columns = hit
+            results = explain_ranked(user_profile, shopping_intent, columns.products,
+                                     feed.indices[:top_k], feed.scores[:top_k])
+            if rewrite_model is not None:
+                await rewrite_reasons(rewrite_model, user_profile, columns.products, results)
+            return [product_response(columns.products[r.index], r) for r in results]
     
-    # 3. Score each product
-    scored_products = []
-    for product in products:
-        score = calculate_match_score(user_profile, product, shopping_intent)
-        reason = generate_explanation(user_profile, product, score)
-        
-        scored_products.append({
-            **product,
-            "relevance_score": score,
-            "reason": reason
-        })
-    
-    # 4. Sort by score and return top recommendations
-    scored_products.sort(key=lambda x: x["relevance_score"], reverse=True)
-    return scored_products[:10]
-
-def calculate_match_score(user_profile, product, shopping_intent):
-    """Calculate how well product matches user"""
+    # 2-3. Get products and rank them; results reference products by index
+    if scorer is None:
+        products = get_products_from_db(shopping_intent)
+        results = rank_products(user_profile, shopping_intent, top_k, ProductColumns(products))
+    else:
+        # The scorer has the catalog preloaded; the worker processes are awaited
+        # so the event loop keeps serving while they score
+        products = scorer.columns.products
+        top, top_scores = await scorer.top_k(user_profile, shopping_intent, top_k)
+        results = explain_ranked(user_profile, shopping_intent, products, top, top_scores)
+    if rewrite_model is not None:
+        await rewrite_reasons(rewrite_model, user_profile, products, results)
+    
+    # 4. Build response dicts only for what we return
+    return [product_response(products[r.index], r) for r in results]
+
+def rank_products(user_profile, shopping_intent, top_k=10, columns=None):
+    """
+    Score a ProductColumns catalog in one batched pass and return the top_k
+    as ScoreResults, best first, with explanations filled in.
+    """
+    scores = score_products_batch(user_profile, columns, shopping_intent)
+    top = top_k_indices(scores, top_k)
+    return explain_ranked(user_profile, shopping_intent, columns.products, top, scores[top])
+
+def explain_ranked(user_profile, shopping_intent, products, top, top_scores):
+    """ScoreResults for already-ranked product indices, with explanations"""
+    # Deleted or filtered-out rows score -1; they only reach the top when few products match
+    live = top_scores >= 0
+    top, top_scores = top[live], top_scores[live]
+    
+    # Re-score only the winners to record which components fired
+    top_products = [products[i] for i in top]
+    reasons = []
+    for product in top_products:
+        components = {}
+        calculate_match_score(user_profile, product, shopping_intent, components)
+        reasons.append(generate_explanation(components))
+    
+    return [
+        ScoreResult(int(i), float(score), reason)
+        for i, score, reason in zip(top, top_scores, reasons)
+    ]
+
+async def rewrite_reasons(model, user_profile, products, results):
+    """Replace the template reasons of ranked ScoreResults with model-polished ones"""
+    reasons = await rewrite_explanations(model, user_profile, [products[r.index] for r in results],
+                                         [r.reason for r in results])
+    for result, reason in zip(results, reasons):
+        result.reason = reason
+
+def product_response(product, result):
+    """API representation of a ranked product (dict or Product record)"""
+    data = product.to_dict() if isinstance(product, Product) else dict(product)
+    data["relevance_score"] = result.score
+    data["reason"] = result.reason
+    return data
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first; equal scores go to the lower index"""
+    if k <= 0:
+        return np.arange(0)
+    if k < len(scores):
+        # Everything above the k-th best score, then ties at it in index order,
+        # so the result does not depend on how argpartition orders ties
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > kth)
+        candidates = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def score_products_batch(user_profile, columns, shopping_intent):
+    """
+    Vectorized calculate_match_score over a ProductColumns catalog.
+    Returns an array of scores aligned with columns.products.
+    """
+    return score_columns(columns, build_score_query(user_profile, columns, shopping_intent))
+
+def build_score_query(user_profile, columns, shopping_intent):
+    """Resolve everything user/intent specific into IDs and vectors for score_columns"""
+    return {
+        "flattering": [columns.color_ids[c] for c in user_profile["flattering_colors"]
+                       if c in columns.color_ids],
+        "avoid": [columns.color_ids[c] for c in user_profile["colors_to_avoid"]
+                  if c in columns.color_ids],
+        "user_tags": columns.tag_vector(user_profile["style_dna"]["top_style_tags"]),
+        "budget": shopping_intent["budget"],
+        "occasion_id": resolve_occasion(shopping_intent, user_profile),
+        "category": columns.category_filter(shopping_intent.get("category")),
+        "stores": columns.store_filter(shopping_intent.get("stores")),
+    }
+
+def score_columns(columns, query):
+    """
+    Score column arrays (see catalog.COLUMN_NAMES) against a query.
+    Works on any row slice of the catalog, which is what parallel_scoring relies on.
+    """
+    score = np.zeros(len(columns.price), dtype=np.float64)
+    
+    # Color match (from color analysis)
+    flattering = np.isin(columns.color, query["flattering"])
+    avoid = np.isin(columns.color, query["avoid"])
+    score += np.where(flattering, 30, np.where(avoid, -20, 0))
+    
+    # Style tag match (from wardrobe analysis)
+    score += 10 * (columns.tags @ query["user_tags"])
+    
+    # Budget match
+    budget = query["budget"]
+    score += np.where(columns.price <= budget, 20, -(columns.price - budget) / 100)
+    
+    # Formality and occasion match
+    occasion_id = query["occasion_id"]
+    if occasion_id is not None:
+        score += formality_points_batch(occasion_id, columns.formality)
+        score += occasion_style_points_batch(
+            occasion_id, columns.season_mask, columns.tags[:, :len(STYLE_TAGS)]
+        )
+    
+    # Deleted (tombstoned) rows and rows outside the intent's category and
+    # stores sort below every product that matches
+    keep = columns.live
+    if query["category"] is not None:
+        keep = keep & (columns.category == query["category"])
+    if query["stores"] is not None:
+        keep = keep & np.isin(columns.store, query["stores"])
+    return np.where(keep, np.clip(score, 0, 100), -1.0)
+
+def calculate_match_score(user_profile, product, shopping_intent, components=None):
+    """
+    Calculate how well product matches user.
+    If a components dict is passed, each score component that fires is recorded in it.
+    """
     score = 0
     
     # Color match (from color analysis)
     if product["color"] in user_profile["flattering_colors"]:
         score += 30
+        record(components, PALETTE_HIT, 30, color=product["color"])
     elif product["color"] in user_profile["colors_to_avoid"]:
         score -= 20
+        record(components, PALETTE_CLASH, -20, color=product["color"])
     
     # Style tag match (from wardrobe analysis)
     user_tags = user_profile["style_dna"]["top_style_tags"]
     product_tags = product["style_tags"]
     common_tags = set(user_tags) & set(product_tags)
     score += len(common_tags) * 10
+    if common_tags:
+        record(components, TAG_OVERLAP, len(common_tags) * 10,
+               tags=" / ".join(sorted(common_tags)))
     
     # Budget match
     if product["price"] <= shopping_intent["budget"]:
         score += 20
+        record(components, BUDGET_FIT, 20, budget=shopping_intent["budget"])
     else:
-        score -= (product["price"] - shopping_intent["budget"]) / 100
+        over = product["price"] - shopping_intent["budget"]
+        score -= over / 100
+        record(components, OVER_BUDGET, -over / 100, over=over)
     
-    # Formality match
-    user_formality = user_profile["style_dna"]["formality_range"]
-    # Add formality logic...
+    # Formality and occasion match
+    occasion_id = resolve_occasion(shopping_intent, user_profile)
+    if occasion_id is not None:
+        occasion = OCCASION_NAMES[occasion_id]
+        points = formality_points(occasion_id, product.get("formality_level", DEFAULT_FORMALITY))
+        score += points
+        record(components, FORMALITY if points > 0 else FORMALITY_MISMATCH, points, occasion=occasion)
+        
+        points = occasion_style_points(occasion_id, season_mask(product.get("seasonality")),
+                                       product["style_tags"])
+        score += points
+        if points:
+            record(components, OCCASION_STYLE, points, occasion=occasion)
     
     return min(max(score, 0), 100)  # Clamp between 0-100
\ No newline at end of file
@@ -0,0 +1,120 @@
+# backend/records.py
+import sys
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Tuple
+
+
+class _Vocabulary(str, Enum):
+    """String enum whose unknown values map to OTHER instead of raising"""
+
+    @classmethod
+    def _missing_(cls, value):
+        if isinstance(value, str):
+            for member in cls:
+                if member.value == value.lower().strip():
+                    return member
+        return cls.OTHER
+
+
+class Category(_Vocabulary):
+    TOP = "top"
+    BOTTOM = "bottom"
+    DRESS = "dress"
+    OUTERWEAR = "outerwear"
+    SHOES = "shoes"
+    OTHER = "other"
+
+
+class Store(_Vocabulary):
+    MYNTRA = "myntra"
+    AMAZON = "amazon"
+    OTHER = "other"
+
+
+def _strings(values):
+    """Interned tuple of strings (accepts a single string, list or None)"""
+    if values is None:
+        return ()
+    if isinstance(values, str):
+        values = [values]
+    return tuple(sys.intern(v) for v in values)
+
+
+class _RecordAccess:
+    """
+    Read-only dict-style access so records can be passed to code written
+    against the scraper's product dicts (calculate_match_score, ProductColumns).
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        result = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, tuple):
+                value = list(value)
+            result[field.name] = value
+        return result
+
+
+@dataclass(slots=True)
+class Product(_RecordAccess):
+    store: Store
+    product_id: str
+    title: str
+    price: float
+    image_url: str
+    product_url: str
+    category: Category
+    color: str
+    style_tags: Tuple[str, ...]
+    formality_level: int
+    seasonality: Tuple[str, ...]
+    brand: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            store=Store(data["store"]),
+            product_id=data["product_id"],
+            title=data["title"],
+            price=data["price"],
+            image_url=data.get("image_url", ""),
+            product_url=data.get("product_url", ""),
+            category=Category(data["category"]),
+            color=sys.intern(data["color"]),
+            style_tags=_strings(data.get("style_tags")),
+            formality_level=data.get("formality_level", 5),
+            seasonality=_strings(data.get("seasonality")),
+            brand=sys.intern(data.get("brand", "")),
+        )
+
+
+@dataclass(slots=True)
+class ScoreResult:
+    """A ranked product, referenced by its index in the scored catalog"""
+    index: int
+    score: float
+    reason: str = ""
+
+
+def as_product(product):
+    """Product record for a scraper product dict (records pass through)"""
+    return product if isinstance(product, Product) else Product.from_dict(product)
+
+
+def to_records(products):
+    """Convert scraper product dicts to Product records"""
+    return [as_product(p) for p in products]
@@ -0,0 +1,204 @@
+# backend/response_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # optional: the local stand-in is used without it
+    redis = None
+
+L1_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_L1_ENTRIES", "1024"))
+# Other workers' L1 copies are not invalidated, so keep L1 short-lived: with
+# a real shared Redis it bounds how stale a profile can be after a write
+# handled elsewhere. Without REDIS_URL the "shared" tier is per-process too
+# and its TTL is capped to this (see ResponseCache).
+L1_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_L1_TTL", "5"))
+L2_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_L2_TTL", "300"))
+
+# Cached read views per user; writes invalidate all of them
+USER_VIEWS = ("user-profile",)
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=L1_MAX_ENTRIES, ttl=L1_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of the Redis client API the shared
+    tier uses (get / set with ex / delete / incr), for development and tests.
+    Not shared between workers: invalidations only reach this process.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self.data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.data[key] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def incr(self, key):
+        with self.lock:
+            expires_at, value = self.data.get(key, (None, b"0"))
+            value = str(int(value) + 1).encode()
+            self.data[key] = (expires_at, value)
+            return int(value)
+
+
+def make_shared_client():
+    """Redis client from REDIS_URL if configured, otherwise the local stand-in"""
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return LocalRedis()
+    if redis is None:
+        raise RuntimeError("REDIS_URL is set but the redis package is not installed (pip install redis)")
+    return redis.Redis.from_url(url)
+
+
+class ResponseCache:
+    """
+    Two-tier cache of serialized JSON responses with ETags.
+    L1 is a per-process LRU; L2 is any Redis-compatible client shared by workers.
+    With the LocalRedis stand-in L2 is per-process as well, so its TTL is
+    capped to L1's and other workers serve stale entries no longer than L1 would.
+    Each user has a version counter in L2 that invalidate_user bumps, so a
+    response fetched before a write is not cached after it (see set).
+    """
+
+    def __init__(self, shared_client=None, l1=None, l2_ttl=L2_TTL_SECONDS):
+        self.l1 = l1 or LRUCache()
+        self.l2 = shared_client if shared_client is not None else make_shared_client()
+        self.l2_ttl = l2_ttl
+        if isinstance(self.l2, LocalRedis):
+            self.l2_ttl = min(l2_ttl, self.l1.ttl)
+
+    @staticmethod
+    def key(view, user_id):
+        return f"stylesphere:{view}:{user_id}"
+
+    @staticmethod
+    def version_key(user_id):
+        return f"stylesphere:version:{user_id}"
+
+    def version(self, user_id):
+        """The user's invalidation count, or None if the shared tier is unreachable"""
+        try:
+            raw = self.l2.get(self.version_key(user_id))
+        except Exception as e:
+            print(f"Shared cache read failed: {str(e)}")
+            return None
+        return int(raw) if raw is not None else 0
+
+    def get(self, key):
+        """(etag, body bytes) or None"""
+        entry = self.l1.get(key)
+        if entry is not None:
+            return entry
+        try:
+            raw = self.l2.get(key)
+        except Exception as e:
+            print(f"Shared cache read failed: {str(e)}")
+            return None
+        if raw is None:
+            return None
+        etag, _, body = bytes(raw).partition(b"\n")
+        entry = (etag.decode(), body)
+        self.l1.set(key, entry)
+        return entry
+
+    def set(self, key, payload, user_id=None, version=None):
+        """
+        Serialize payload, store it in both tiers and return (etag, body bytes).
+        Pass the user's version(), read before payload was fetched: if the user
+        was invalidated since, payload may predate the write and is not stored.
+        """
+        body = json.dumps(payload, default=str, separators=(",", ":")).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        entry = (etag, body)
+        if version is not None and self.version(user_id) != version:
+            return entry
+        self.l1.set(key, entry)
+        try:
+            self.l2.set(key, etag.encode() + b"\n" + body, ex=self.l2_ttl)
+        except Exception as e:
+            print(f"Shared cache write failed: {str(e)}")
+        if version is not None and self.version(user_id) != version:
+            # Invalidated between the check and the write; invalidate_user bumps
+            # the version before deleting, so one of the two checks sees it
+            self._delete([key])
+        return entry
+
+    def invalidate_user(self, user_id):
+        try:
+            self.l2.incr(self.version_key(user_id))
+        except Exception as e:
+            print(f"Shared cache invalidation failed: {str(e)}")
+        self._delete([self.key(view, user_id) for view in USER_VIEWS])
+
+    def _delete(self, keys):
+        for key in keys:
+            self.l1.delete(key)
+        try:
+            self.l2.delete(*keys)
+        except Exception as e:
+            print(f"Shared cache invalidation failed: {str(e)}")
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value covers etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
@@ -3,6 +3,8 @@ import requests
 from bs4 import BeautifulSoup
 import json
 
+from records import to_records
+
 def scrape_myntra_search(query, max_results=20):
     """Simple Myntra scraper for demo purposes"""
     # Note: In production, use official API or ethical scraping
@@ -23,7 +25,7 @@ def scrape_myntra_search(query, max_results=20):
         }
         for i in range(max_results)
     ]
-    return mock_products
+    return to_records(mock_products)
 
 def scrape_amazon_search(query, max_results=20):
     """Simple Amazon scraper for demo purposes"""
@@ -44,4 +46,4 @@ def scrape_amazon_search(query, max_results=20):
         }
         for i in range(max_results)
     ]
-    return mock_products
\ No newline at end of file
+    return to_records(mock_products)
\ No newline at end of file
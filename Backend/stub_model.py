@@ -0,0 +1,100 @@
+# backend/stub_model.py
+import json
+import os
+import random
+import threading
+import time
+
+# Canned answers shaped like the JSON each endpoint's prompt asks for
+COLOR_ANALYSIS = {
+    "season": "Winter",
+    "confidence_score": 0.8,
+    "flattering_colors": ["emerald green", "sapphire blue", "berry red", "pure white", "black"],
+    "colors_to_avoid": ["pastel orange", "golden yellow", "warm beige"],
+    "undertone": "cool",
+    "reasoning": "Stub model response.",
+}
+WARDROBE_ITEM = {
+    "category": "top",
+    "subcategory": "t-shirt",
+    "primary_color": "navy blue",
+    "secondary_colors": ["white"],
+    "pattern": "solid",
+    "fit": "regular",
+    "formality_level": 3,
+    "seasonality": ["all-season"],
+    "style_tags": ["casual", "minimalist"],
+    "description": "Stub model response.",
+}
+STYLE_DNA = {
+    "dominant_aesthetics": ["minimalist", "classic"],
+    "preferred_fit": "fitted",
+    "color_preferences": ["navy blue", "white", "black"],
+    "pattern_affinity": "low",
+    "formality_range": "smart-casual",
+    "risk_taking_score": 3,
+    "missing_categories": ["outerwear"],
+    "style_summary": "Stub model response.",
+    "top_style_tags": ["minimalist", "classic", "casual", "preppy", "elegant"],
+}
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """
+    Stand-in for genai.GenerativeModel with injectable faults: base latency
+    with jitter, a random error rate and a random hang rate. Thread-safe.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, hang_rate=0.0,
+                 hang_seconds=60.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.getenv("STUB_MODEL_LATENCY", "0.05")),
+            jitter=float(os.getenv("STUB_MODEL_JITTER", "0")),
+            error_rate=float(os.getenv("STUB_MODEL_ERROR_RATE", "0")),
+            hang_rate=float(os.getenv("STUB_MODEL_HANG_RATE", "0")),
+        )
+
+    def configure(self, **faults):
+        """Change fault settings on the fly (e.g. to simulate an outage mid-test)"""
+        with self.lock:
+            for name, value in faults.items():
+                setattr(self, name, value)
+
+    def generate_content(self, parts, **kwargs):
+        with self.lock:
+            self.calls += 1
+            roll = self.random.random()
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            error_rate, hang_rate = self.error_rate, self.hang_rate
+
+        if roll < hang_rate:
+            time.sleep(self.hang_seconds)
+        else:
+            time.sleep(delay)
+        if hang_rate <= roll < hang_rate + error_rate:
+            raise RuntimeError("503 Service Unavailable (injected)")
+
+        prompt = parts[0] if isinstance(parts, list) else parts
+        if "clothing item" in prompt:
+            result = WARDROBE_ITEM
+        elif "color analysis" in prompt:
+            result = COLOR_ANALYSIS
+        else:
+            result = STYLE_DNA
+        return StubResponse("```json\n" + json.dumps(result) + "\n```")
@@ -0,0 +1,205 @@
+# backend/tests/test_feeds.py
+# Invariants of incremental feed maintenance (catalog_sync deltas patching FeedStore feeds).
+# Run from the backend folder: python -m pytest tests
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import feeds as feeds_module
+from catalog import ProductColumns
+from catalog_sync import CatalogSync, refresh_catalog
+from feeds import Feed, FeedStore
+from occasions import SEASONS, STYLE_TAGS
+from recommendation import score_products_batch
+
+USER_PROFILE = {
+    "flattering_colors": ["navy blue", "white"],
+    "colors_to_avoid": ["mustard"],
+    "style_dna": {"top_style_tags": ["classic", "minimalist"], "formality_range": "smart-casual"},
+}
+INTENT_KEYS = [("", "office", 2000), ("top", "office", 2000), ("dress", "casual", 3000)]
+SCOPE = ("test", "all")
+
+
+def make_products(n, seed=0, prefix="p"):
+    rng = random.Random(seed)
+    return [
+        {
+            "store": rng.choice(["myntra", "amazon"]),
+            "product_id": f"{prefix}_{i}",
+            "title": f"Item {i}",
+            "price": rng.randrange(300, 6000, 50),
+            "category": rng.choice(["top", "bottom", "dress"]),
+            "color": rng.choice(["navy blue", "white", "black", "mustard", "red"]),
+            "style_tags": rng.sample(STYLE_TAGS, 2),
+            "formality_level": rng.randint(1, 10),
+            "seasonality": rng.sample(SEASONS, 1),
+        }
+        for i in range(n)
+    ]
+
+
+def next_scrape(products, seed):
+    """Reprice some products, drop some and add new ones"""
+    rng = random.Random(seed)
+    scrape = [dict(p) for p in products]
+    for i in rng.sample(range(len(scrape)), 40):
+        scrape[i]["price"] = rng.randrange(300, 6000, 50)
+    for _ in range(15):
+        scrape.pop(rng.randrange(len(scrape)))
+    return scrape + make_products(15, seed=seed, prefix=f"new{seed}")
+
+
+def make_store(products, feed_size=10):
+    sync = CatalogSync()
+    columns, _ = refresh_catalog(sync, SCOPE, products, None)
+    store = FeedStore(columns, intent_keys=INTENT_KEYS, feed_size=feed_size)
+    store.schedule("u1", USER_PROFILE)
+    with store.build_lock:
+        store._build_user(store.pending.popitem()[0])
+    return sync, columns, store
+
+
+def assert_feeds_exact(store, columns):
+    """Every feed lists the true top rows of the current catalog, best first"""
+    entry = store.users["u1"]
+    assert set(entry.feeds) == set(INTENT_KEYS)
+    categories = store._categories(columns.products)
+    for (category, occasion, budget), feed in entry.feeds.items():
+        scores = score_products_batch(USER_PROFILE, columns, {"occasion": occasion, "budget": budget})
+        candidates = columns.live & (categories == category) if category else columns.live
+        expected = np.sort(scores[candidates])[::-1][:len(feed.indices)].astype(np.float32)
+        np.testing.assert_allclose(feed.scores, expected, atol=1e-4)
+        np.testing.assert_allclose(scores[feed.indices], feed.scores, atol=1e-4)
+        assert columns.live[feed.indices].all()
+
+
+def test_patch_drops_touched_rows_and_entries_below_threshold():
+    store = FeedStore(intent_keys=INTENT_KEYS, feed_size=3)
+    feed = Feed(np.array([5, 7, 9], dtype=np.int32), np.array([90, 80, 70], dtype=np.float32),
+                70.0, 0, "fp", time.time())
+    # Row 7 was deleted, row 9 re-scored to 60 (below the threshold: rows outside
+    # the feed may beat it), row 12 is new at 85.
+    feed = store._patch(feed, touched=np.array([9, 12, 7]), changed_rows=np.array([9, 12]),
+                        changed_scores=np.array([60.0, 85.0]), category_mask=None)
+    assert feed.indices.tolist() == [5, 12]
+    assert feed.scores.tolist() == [90, 85]
+    assert feed.threshold == 70.0
+
+
+def test_patch_truncates_to_feed_size_and_raises_threshold():
+    store = FeedStore(intent_keys=INTENT_KEYS, feed_size=2)
+    feed = Feed(np.array([1, 2], dtype=np.int32), np.array([50, 40], dtype=np.float32),
+                -np.inf, 0, "fp", time.time())
+    feed = store._patch(feed, touched=np.array([3, 4]), changed_rows=np.array([3, 4]),
+                        changed_scores=np.array([45.0, -1.0]), category_mask=None)
+    assert feed.indices.tolist() == [1, 3]
+    assert feed.threshold == 40.0
+
+
+def test_deltas_keep_feeds_exact():
+    products = make_products(600)
+    sync, columns, store = make_store(products)
+    for seed in range(1, 4):
+        products = next_scrape(products, seed)
+        columns, delta = refresh_catalog(sync, SCOPE, products, columns, store)
+        assert len(delta)
+        assert store.columns is columns
+        assert_feeds_exact(store, columns)
+
+
+def test_delta_waits_for_an_in_flight_build(monkeypatch):
+    products = make_products(600)
+    sync, columns, store = make_store(products)
+
+    # Pause the next build half-way through scoring
+    building, resume = threading.Event(), threading.Event()
+    real_score = feeds_module.score_products_batch
+
+    def paused_score(*args):
+        building.set()
+        resume.wait(5)
+        return real_score(*args)
+
+    monkeypatch.setattr(feeds_module, "score_products_batch", paused_score)
+    store.start()
+    try:
+        store.schedule("u1", USER_PROFILE)
+        assert building.wait(5)
+
+        version = columns.version
+        products = next_scrape(products, seed=7)
+        refresher = threading.Thread(target=refresh_catalog, args=(sync, SCOPE, products, columns, store))
+        refresher.start()
+        time.sleep(0.2)
+        # The delta must not touch the columns while the build reads them
+        assert columns.version == version
+        assert refresher.is_alive()
+
+        resume.set()
+        refresher.join(5)
+        assert columns.version == version + 1
+        deadline = time.time() + 5
+        while store.pending and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        resume.set()
+        store.stop()
+    assert_feeds_exact(store, columns)
+
+
+def test_build_from_an_older_generation_is_discarded():
+    products = make_products(300)
+    sync, columns, store = make_store(products)
+    before = store.users["u1"].feeds
+
+    # A catalog refresh lands between snapshotting the catalog and storing the result
+    real_build = store.build_feeds
+
+    def build_then_refresh(*args):
+        result = real_build(*args)
+        store.refresh_catalog(ProductColumns(next_scrape(products, seed=3)))
+        return result
+
+    store.build_feeds = build_then_refresh
+    store.schedule("u1")
+    store.pending.clear()
+    with store.build_lock:
+        store._build_user("u1")
+    assert store.users["u1"].feeds is before
+    assert "u1" in store.pending
+
+
+def test_lookups_are_not_blocked_while_a_delta_is_patched(monkeypatch):
+    products = make_products(600)
+    sync, columns, store = make_store(products)
+
+    # Pause the delta while it re-scores the changed rows
+    patching, resume = threading.Event(), threading.Event()
+    real_score = feeds_module.score_columns
+
+    def paused_score(*args):
+        patching.set()
+        resume.wait(5)
+        return real_score(*args)
+
+    monkeypatch.setattr(feeds_module, "score_columns", paused_score)
+    products = next_scrape(products, seed=5)
+    refresher = threading.Thread(target=refresh_catalog, args=(sync, SCOPE, products, columns, store))
+    refresher.start()
+    try:
+        assert patching.wait(5)
+        intent = {"category": "top", "occasion": "office", "budget": 2000}
+        start = time.perf_counter()
+        assert store.lookup("u1", USER_PROFILE, intent, 5) is not None
+        assert time.perf_counter() - start < 0.5
+    finally:
+        resume.set()
+        refresher.join(5)
+    assert_feeds_exact(store, columns)
@@ -0,0 +1,82 @@
+# backend/tests/test_jobs.py
+# Leases on the SQLite job queue when several processes drain one file.
+# Run from the backend folder: python -m pytest tests
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import DONE, QUEUED, RUNNING, JobQueue, JobRunner
+
+
+def test_recover_leaves_live_leases_alone(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = JobQueue(path, lease=60), JobQueue(path, lease=60)
+    job_id = first.submit("work", "u1", {})
+    assert first.claim()["id"] == job_id
+
+    # A second process starting up must not take over a job that is still being run
+    assert second.recover() == 0
+    assert second.claim() is None
+    assert second.get(job_id)["status"] == RUNNING
+
+
+def test_expired_lease_is_requeued_and_old_owner_cannot_finish(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = JobQueue(path, lease=0.05), JobQueue(path, lease=60)
+    job_id = first.submit("work", "u1", {})
+    first.claim()
+    time.sleep(0.1)
+
+    assert second.recover() == 1
+    job = second.claim()
+    assert job["id"] == job_id and job["attempts"] == 2
+
+    # The first process lost its lease, so its late result is dropped
+    assert not first.complete(job_id, {"by": "first"})
+    assert second.complete(job_id, {"by": "second"})
+    job = first.get(job_id)
+    assert job["status"] == DONE and job["result"] == {"by": "second"}
+
+
+def test_heartbeat_renews_leases_of_running_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    other = JobQueue(path, lease=60)
+
+    async def slow(payload, attempt):
+        await asyncio.sleep(0.5)
+        return {"ok": True}
+
+    async def scenario():
+        runner = JobRunner(JobQueue(path, lease=0.15), {"work": slow}, workers=1)
+        await runner.start()
+        job_id = runner.submit("work", "u1", {})
+        await asyncio.sleep(0.3)
+        # Past the first lease, but the heartbeat has kept it alive
+        assert other.recover() == 0
+        await asyncio.sleep(0.4)
+        await runner.stop()
+        return job_id
+
+    job_id = asyncio.run(scenario())
+    assert other.get(job_id)["status"] == DONE
+
+
+def test_stop_hands_interrupted_jobs_back(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+
+    async def forever(payload, attempt):
+        await asyncio.sleep(60)
+
+    async def scenario():
+        runner = JobRunner(JobQueue(path), {"work": forever}, workers=1)
+        await runner.start()
+        job_id = runner.submit("work", "u1", {})
+        await asyncio.sleep(0.1)
+        await runner.stop()
+        return job_id
+
+    job_id = asyncio.run(scenario())
+    assert JobQueue(path).get(job_id)["status"] == QUEUED
@@ -0,0 +1,56 @@
+# backend/tests/test_parallel_scoring.py
+# The shared-memory copy of a ParallelScorer stays in step with catalog deltas.
+# Run from the backend folder: python -m pytest tests
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from catalog_sync import CatalogSync, refresh_catalog
+from parallel_scoring import ParallelScorer
+from recommendation import score_products_batch, top_k_indices
+from test_feeds import SCOPE, USER_PROFILE, make_products, next_scrape
+
+INTENT = {"occasion": "office", "budget": 2000}
+
+
+def test_deltas_are_written_into_the_shared_copy():
+    products = make_products(2000)
+    sync = CatalogSync()
+    columns, _ = refresh_catalog(sync, SCOPE, products, None)
+    scorer = ParallelScorer(columns, workers=2, min_products=0)
+    try:
+        blocks = scorer.shared.spec
+        for seed in range(1, 4):
+            products = next_scrape(products, seed)
+            columns, delta = refresh_catalog(sync, SCOPE, products, columns, scorer=scorer)
+            assert delta.inserts and delta.deletes
+            # Patched in place: still parallel, same shared blocks
+            assert scorer.parallel
+            assert scorer.shared.spec is blocks
+
+            top, scores = asyncio.run(scorer.top_k(USER_PROFILE, INTENT, 20))
+            expected = score_products_batch(USER_PROFILE, columns, INTENT)
+            np.testing.assert_array_equal(top, top_k_indices(expected, 20))
+            np.testing.assert_allclose(scores, expected[top])
+    finally:
+        scorer.close()
+
+
+def test_inserts_past_the_spare_rows_reallocate():
+    products = make_products(200)
+    sync = CatalogSync()
+    columns, _ = refresh_catalog(sync, SCOPE, products, None)
+    scorer = ParallelScorer(columns, workers=2, min_products=0)
+    try:
+        blocks = scorer.shared.spec
+        products = products + make_products(100, seed=9, prefix="extra")
+        columns, _ = refresh_catalog(sync, SCOPE, products, columns, scorer=scorer)
+        assert scorer.parallel
+        assert scorer.shared.spec is not blocks
+        assert scorer.shared.capacity >= len(columns)
+    finally:
+        scorer.close()